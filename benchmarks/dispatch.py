@@ -0,0 +1,171 @@
+"""Micro-benchmarks for EventDispatcher.dispatch.
+
+Compares the current dispatcher with a reimplementation of the previous
+one, which called every observer through wrapper filters and a gather.
+
+    python -m benchmarks.dispatch
+"""
+from __future__ import annotations
+import asyncio
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Generic, Protocol, Type, TypeGuard, TypeVar
+
+from matrix_client import Client, MessageEvent
+from matrix_client.event_dispatcher import Context, EventDispatcher
+from matrix_client.models import Event
+
+
+T = TypeVar("T", bound=Event)
+U = TypeVar("U", bound=Event)
+
+
+class ContextTypeChecker(Generic[U, T]):
+    """A protocol for checking the type of a context."""
+
+    def __init__(self, type_: Type[T]) -> None:
+        self.type_ = type_
+
+    def check(self, context: Context[U]) -> TypeGuard[Context[T]]:
+        """Check the type of a context."""
+        return isinstance(context.event, self.type_)
+
+
+class Filter(Protocol[T]):
+    """A filter for an event."""
+
+    async def __call__(self, context: Context[T]) -> None:
+        """Handle an event if it passes the filter."""
+
+
+class RoomFilter(Filter[T]):
+    """A room event filter."""
+
+    def __init__(
+        self, room_id: str, callback: Callable[[Context[T]], Awaitable[None]]
+    ) -> None:
+        self.room_id = room_id
+        self.callback = callback
+
+    async def __call__(self, context: Context[T]) -> None:
+        """Handle an event if it is in the room."""
+        if context.event._room == self.room_id:
+            await self.callback(context)
+
+
+class OneTimeFilter(Filter[T]):
+    """A one-time event filter."""
+
+    def __init__(self, callback: Callable[[Context[T]], Awaitable[None]]) -> None:
+        self.callback = callback
+
+    async def __call__(self, context: Context[T]) -> None:
+        """Handle an event if it has not been called before."""
+        await self.callback(context)
+        context.unsubscribe()
+
+
+class EventTypeFilter(Filter[T], Generic[T, U]):
+    """A filter that filters by event type."""
+
+    def __init__(
+        self, type_: Type[U], callback: Callable[[Context[U]], Awaitable[None]]
+    ) -> None:
+        self.type_ = type_
+        self.callback = callback
+
+    async def __call__(self, context: Context[T]) -> None:
+        """Handle an event if it is of the correct type."""
+        if ContextTypeChecker[T, U](self.type_).check(context):
+            await self.callback(context)
+
+
+class LegacyDispatcher:
+    """The dispatcher as it was before routing tables were added."""
+
+    def __init__(self) -> None:
+        self._observers: list[Callable[[Context[Event]], Awaitable[None]]] = []
+
+    def register(self, observer, *, on=None, room=None, once=False) -> None:
+        if once:
+            observer = OneTimeFilter[Event](observer)
+        if room is not None:
+            observer = RoomFilter[Event](room, observer)
+        if on is not None:
+            observer = EventTypeFilter[Event, Event](on, observer)
+        self._observers.append(observer)
+
+    def unregister(self, observer) -> None:
+        self._observers.remove(observer)
+
+    async def dispatch(self, event: Event) -> None:
+        await asyncio.gather(
+            *(
+                observer(
+                    Context(event=event, unsubscribe=lambda: self.unregister(observer))
+                )
+                for observer in self._observers
+            )
+        )
+
+
+async def handler(_: object) -> None:
+    pass
+
+
+def make_event(client: Client, room_id: str) -> MessageEvent:
+    return MessageEvent(
+        client,
+        "m.room.message",
+        {},
+        "@user:example.org",
+        room_id,
+        0,
+        "$event",
+        None,
+        {"msgtype": "m.text", "body": "hello"},
+    )
+
+
+def populate(dispatcher, rooms: int) -> None:
+    for room in range(rooms):
+        dispatcher.register(handler, on=MessageEvent, room=f"!room{room}")
+
+
+async def measure(dispatcher, event: Event, iterations: int) -> tuple[float, int]:
+    for _ in range(100):
+        await dispatcher.dispatch(event)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await dispatcher.dispatch(event)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in range(1000):
+        await dispatcher.dispatch(event)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / iterations * 1e6, peak
+
+
+async def main() -> None:
+    client = Client("https://example.org")
+    event = make_event(client, "!room0")
+    iterations = 10_000
+    print(
+        f"{'observers':>10} {'dispatcher':>12} {'us/dispatch':>12} {'peak bytes':>12}"
+    )
+    for rooms in (1, 10, 100, 1000):
+        for name, dispatcher in (
+            ("legacy", LegacyDispatcher()),
+            ("indexed", EventDispatcher()),
+        ):
+            populate(dispatcher, rooms)
+            per_dispatch, peak = await measure(
+                dispatcher, event, max(100, iterations // rooms)
+            )
+            print(f"{rooms:>10} {name:>12} {per_dispatch:>12.2f} {peak:>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
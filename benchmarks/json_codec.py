@@ -0,0 +1,82 @@
+"""Compare the installed JSON backends on sync payloads.
+
+Pass recorded /sync responses as arguments; without any, a synthetic
+payload shaped like a large catch-up sync is generated.
+
+    python -m benchmarks.json_codec [sync.json ...]
+"""
+from __future__ import annotations
+import sys
+import time
+
+from matrix_client.json_codec import CODECS
+
+
+def synthetic_sync(rooms: int = 500, events_per_room: int = 50) -> dict:
+    def event(room: int, index: int) -> dict:
+        return {
+            "type": "m.room.message",
+            "event_id": f"$event{room}_{index}",
+            "sender": f"@user{index % 37}:example.org",
+            "origin_server_ts": 1_700_000_000_000 + index,
+            "unsigned": {"age": index * 1000},
+            "content": {
+                "msgtype": "m.text",
+                "body": f"Message number {index} in room {room} – ünïcödé 🙂",
+            },
+        }
+
+    def member(room: int, index: int) -> dict:
+        return {
+            "type": "m.room.member",
+            "event_id": f"$member{room}_{index}",
+            "sender": f"@user{index}:example.org",
+            "state_key": f"@user{index}:example.org",
+            "unsigned": {"age": 0},
+            "content": {"membership": "join", "displayname": f"User {index}"},
+        }
+
+    return {
+        "next_batch": "s123_456",
+        "rooms": {
+            "join": {
+                f"!room{room}:example.org": {
+                    "state": {"events": [member(room, i) for i in range(20)]},
+                    "timeline": {
+                        "events": [event(room, i) for i in range(events_per_room)],
+                        "limited": False,
+                    },
+                }
+                for room in range(rooms)
+            }
+        },
+    }
+
+
+def bench(payload: bytes, repeat: int = 5) -> None:
+    print(f"payload: {len(payload) / 1e6:.1f} MB")
+    reference = CODECS["json"].loads(payload)
+    for name, codec in CODECS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            codec.loads(payload)
+        decode = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        for _ in range(repeat):
+            codec.dumps(reference)
+        encode = (time.perf_counter() - start) / repeat
+        print(f"  {name:>8}: decode {decode * 1e3:8.1f} ms  encode {encode * 1e3:8.1f} ms")
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, "rb") as file:
+                print(path)
+                bench(file.read())
+    else:
+        bench(CODECS["json"].dumps(synthetic_sync()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measure the memory held per stored event.
+
+Compares what Client stores for a sync, both as lazy records and once
+every model is built, with a reimplementation of the previous
+dict-backed dataclasses (no slots, no interning). Each is measured with
+and without the raw JSON kept around.
+
+    python -m benchmarks.memory
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import asyncio
+import gc
+import tracemalloc
+from typing import Callable
+
+from benchmarks.json_codec import synthetic_sync
+from matrix_client import Client
+from matrix_client.json_codec import STDLIB
+
+
+@dataclass
+class LegacyMessageEvent:
+    """The message event as it was before slots and interning."""
+
+    _client: Client = field(repr=False)
+    type: str
+    raw: dict | None = field(repr=False)
+    _sender: str = field(repr=False)
+    _room: str = field(repr=False)
+    _age: int = field(repr=False)
+    event_id: str = field(repr=False)
+    redacted: object = field(repr=False)
+    content: dict = field(repr=False)
+    edits: list = field(default_factory=list)
+
+
+def build_legacy(client: Client, payload: dict, keep_raw: bool) -> list:
+    return [
+        LegacyMessageEvent(
+            client,
+            event["type"],
+            event if keep_raw else None,
+            event["sender"],
+            room_id,
+            event["unsigned"]["age"],
+            event["event_id"],
+            None,
+            event["content"],
+        )
+        for room_id, room in payload["rooms"]["join"].items()
+        for event in room["timeline"]["events"]
+    ]
+
+
+def store_sync(payload: dict, compact: bool, built: bool) -> list:
+    """Store the events the way Client does, optionally building them all."""
+    client = Client("https://example.org", compact_models=compact)
+    asyncio.run(client.process_sync(payload, is_initial=True))
+    if built:
+        list(client.events)
+    return [client]
+
+
+def measure(name: str, build: Callable[[dict], list]) -> None:
+    payload = synthetic_sync(rooms=200, events_per_room=100)
+    for room in payload["rooms"]["join"].values():
+        # Only the timeline is measured, not the room state
+        del room["state"]
+    encoded = STDLIB.dumps(payload)
+    events = 200 * 100
+    gc.collect()
+    tracemalloc.start()
+    payload = STDLIB.loads(encoded)
+    held = build(payload)
+    del payload
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    print(f"{name:>28}: {current / events:8.0f} bytes/event ({events} events)")
+
+
+def main() -> None:
+    client = Client("https://example.org")
+    measure("legacy, raw kept", lambda payload: build_legacy(client, payload, True))
+    measure("legacy, no raw", lambda payload: build_legacy(client, payload, False))
+    for compact in (False, True):
+        mode = "compact" if compact else "raw kept"
+        measure(
+            f"records, {mode}",
+            lambda payload: store_sync(payload, compact, built=False),
+        )
+        measure(
+            f"built, {mode}",
+            lambda payload: store_sync(payload, compact, built=True),
+        )
+
+
+if __name__ == "__main__":
+    main()
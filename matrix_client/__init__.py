@@ -1,5 +1,9 @@
+from .authentication import Credentials
 from .client import Client
 from .event_dispatcher import Context
+from .event_queue import OverflowPolicy, QueueOptions, QueueStats
+from .event_store import EventStoreStats, RetentionPolicy
+from .json_codec import JSONCodec
 from .models import (
     Event,
     MessageEditEvent,
@@ -10,16 +14,47 @@ from .models import (
     Room,
     User,
 )
+from .profile_cache import ProfileCacheOptions
+from .rate_limit import EndpointClass, RateLimitOptions, ThrottleStats
+from .response_cache import ResponseCacheOptions
+from .retry import CircuitOpenError, CircuitState, RetryOptions, ServerError
+from .scheduler import SchedulerOptions
+from .send_queue import SendOptions, SendPriority
+from .session import ConnectionOptions
+from .store import StoreOptions
+from .sync import SyncOptions
 
 __all__ = [
+    "CircuitOpenError",
+    "CircuitState",
     "Client",
+    "ConnectionOptions",
     "Context",
+    "Credentials",
     "Event",
+    "EndpointClass",
+    "EventStoreStats",
+    "JSONCodec",
     "MessageEditEvent",
     "MessageEvent",
     "MessageType",
     "Myself",
+    "OverflowPolicy",
+    "ProfileCacheOptions",
+    "QueueOptions",
+    "QueueStats",
+    "RateLimitOptions",
     "RedactionEvent",
+    "ResponseCacheOptions",
+    "RetentionPolicy",
+    "RetryOptions",
+    "StoreOptions",
+    "SyncOptions",
     "Room",
+    "SchedulerOptions",
+    "SendOptions",
+    "SendPriority",
+    "ServerError",
+    "ThrottleStats",
     "User",
 ]
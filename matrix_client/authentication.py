@@ -1,29 +1,201 @@
-import aiohttp
+from __future__ import annotations
+import asyncio
+from dataclasses import asdict, dataclass
+import os
+import time
+import traceback
+
+from .json_codec import JSONCodec, get_codec
+from .session import SessionPool
+
+# How long before it expires an access token gets refreshed, in seconds
+REFRESH_MARGIN = 60
+
+
+@dataclass
+class Credentials:
+    """An access token and what comes with it."""
+
+    access_token: str
+    device_id: str | None = None
+    user_id: str | None = None
+    refresh_token: str | None = None
+    expires_at: float | None = None
+
+    @classmethod
+    def from_response(
+        cls, response: dict, previous: Credentials | None = None
+    ) -> Credentials:
+        """Build credentials from a login or refresh response."""
+        expires_in_ms = response.get("expires_in_ms")
+        return cls(
+            response["access_token"],
+            response.get("device_id", previous and previous.device_id),
+            response.get("user_id", previous and previous.user_id),
+            response.get("refresh_token", previous and previous.refresh_token),
+            time.time() + expires_in_ms / 1000 if expires_in_ms else None,
+        )
+
+
+def _is_user(user_id: str, username: str) -> bool:
+    """Return whether a user ID belongs to a login username."""
+    if username.startswith("@"):
+        return user_id == username
+    return user_id[1:].split(":", 1)[0] == username
 
 
 class Authentication:
-    """Represents an authentication class for the bot."""
+    """Represents an authentication class for the bot.
 
-    def __init__(self, homeserver_url: str) -> None:
+    With a `credentials_path`, the access token and device ID are saved
+    to that JSON file and reused on the next start, so the bot keeps a
+    single device instead of logging in again every time.
+    """
+
+    def __init__(
+        self,
+        homeserver_url: str,
+        session_pool: SessionPool | None = None,
+        json_codec: JSONCodec | None = None,
+        credentials: Credentials | None = None,
+        credentials_path: str | None = None,
+    ) -> None:
         self.homeserver_url = homeserver_url
-        self.token: str | None = None
+        self.session_pool = session_pool or SessionPool()
+        self.json_codec = json_codec or get_codec()
+        self.credentials_path = credentials_path
+        self.credentials = credentials or self.load()
+        self._refreshing = asyncio.Lock()
+
+    @property
+    def token(self) -> str | None:
+        """Return the current access token, if any."""
+        return self.credentials.access_token if self.credentials else None
+
+    @token.setter
+    def token(self, token: str) -> None:
+        self.credentials = Credentials(token)
+
+    def load(self) -> Credentials | None:
+        """Read the saved credentials, if there are any."""
+        path = self.credentials_path
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as file:
+                return Credentials(**self.json_codec.loads(file.read()))
+        except Exception:
+            # A corrupt or outdated file is no worse than not having one
+            traceback.print_exc()
+            return None
+
+    def save(self) -> None:
+        """Save the credentials, readable only by the current user."""
+        if self.credentials_path is None or self.credentials is None:
+            return
+        temporary = f"{self.credentials_path}.tmp"
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        descriptor = os.open(temporary, flags, 0o600)
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(self.json_codec.dumps(asdict(self.credentials)))
+        os.replace(temporary, self.credentials_path)
+
+    async def login(self, username: str, password: str) -> None:
+        """Reuse the saved access token if it's still valid, else log in."""
+        if self.credentials is not None and await self.validate(username):
+            return
+        await self.password_auth(username, password)
+
+    async def validate(self, username: str | None = None) -> bool:
+        """Check the token with the homeserver, refreshing it if needed.
+
+        With a `username`, which can be a full user ID or just the local
+        part, the token must also belong to that user.
+        """
+        credentials = self.credentials
+        if credentials is None:
+            return False
+        response = await self._send(
+            "GET",
+            "account/whoami",
+            headers={"Authorization": f"Bearer {credentials.access_token}"},
+        )
+        if "user_id" in response:
+            if username is not None and not _is_user(response["user_id"], username):
+                # Saved for another account, so none of it applies
+                self.credentials = None
+                return False
+            credentials.user_id = response["user_id"]
+            credentials.device_id = response.get("device_id", credentials.device_id)
+            return True
+        if credentials.refresh_token is None:
+            return False
+        return await self.refresh()
 
     async def password_auth(self, username: str, password: str) -> None:
-        """Authenticate using a username and password."""
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{self.homeserver_url}/_matrix/client/v3/login",
-                json={
-                    "type": "m.login.password",
-                    "identifier": {"type": "m.id.user", "user": username},
-                    "password": password,
-                },
-            ) as response:
-                response_json = await response.json()
-                self.token = response_json["access_token"]
+        """Authenticate using a username and password.
+
+        The saved device ID is reused, so logging in again doesn't add a
+        device to the account.
+        """
+        body = {
+            "type": "m.login.password",
+            "identifier": {"type": "m.id.user", "user": username},
+            "password": password,
+            "refresh_token": True,
+        }
+        if self.credentials is not None and self.credentials.device_id:
+            body["device_id"] = self.credentials.device_id
+        response = await self._send("POST", "login", body)
+        self.credentials = Credentials.from_response(response, self.credentials)
+        self.save()
+
+    async def refresh(self) -> bool:
+        """Get a new access token with the refresh token."""
+        stale = self.token
+        async with self._refreshing:
+            if self.token != stale:
+                # Someone else refreshed it while we were waiting
+                return True
+            if self.credentials is None or self.credentials.refresh_token is None:
+                return False
+            response = await self._send(
+                "POST", "refresh", {"refresh_token": self.credentials.refresh_token}
+            )
+            if "access_token" not in response:
+                # The refresh token is no good either; stop trying it, so
+                # that the next login falls back to the password
+                self.credentials.refresh_token = None
+                self.credentials.expires_at = None
+                self.save()
+                return False
+            self.credentials = Credentials.from_response(response, self.credentials)
+            self.save()
+            return True
+
+    async def _send(
+        self, method: str, endpoint: str, body: dict | None = None, **kwargs
+    ) -> dict:
+        session = await self.session_pool.get()
+        if body is not None:
+            kwargs["data"] = self.json_codec.dumps(body)
+            kwargs["headers"] = kwargs.get("headers", {}) | {
+                "Content-Type": "application/json"
+            }
+        async with session.request(
+            method, f"{self.homeserver_url}/_matrix/client/v3/{endpoint}", **kwargs
+        ) as response:
+            return self.json_codec.loads(await response.read())
 
     async def get_token(self) -> str:
-        """Return the access token."""
-        if self.token is None:
+        """Return the access token, refreshing it when it's about to expire."""
+        if self.credentials is None:
             raise ValueError("Token is not set.")
-        return self.token
+        expires_at = self.credentials.expires_at
+        if (
+            expires_at is not None
+            and self.credentials.refresh_token is not None
+            and expires_at - time.time() < REFRESH_MARGIN
+        ):
+            await self.refresh()
+        return self.credentials.access_token
@@ -1,12 +1,18 @@
 import asyncio
+import json
+import sys
+from typing import AsyncIterator, Iterable, Mapping, Type
 import uuid
 
 import aiohttp
 
 from matrix_client.observer_factory import ObserverFactory
 
-from .authentication import Authentication
+from .authentication import Authentication, Credentials
 from .event_dispatcher import EventDispatcher
+from .event_queue import EventQueues, QueueOptions
+from .event_store import EventRecord, EventStore, RetentionPolicy
+from .json_codec import JSONCodec, get_codec
 from .models import (
     Event,
     MessageEditEvent,
@@ -16,24 +22,148 @@ from .models import (
     Room,
     User,
 )
+from .profile_cache import ProfileCache, ProfileCacheOptions
+from .rate_limit import (
+    EndpointClass,
+    RateLimiter,
+    RateLimitOptions,
+    classify,
+    retry_after,
+)
+from .response_cache import ResponseCache, ResponseCacheOptions
+from .retry import (
+    RETRYABLE_METHODS,
+    TRANSIENT_ERRORS,
+    CircuitOpenError,
+    CircuitState,
+    RetryOptions,
+    RetryPolicy,
+    ServerError,
+)
+from .room_state import RoomState
+from .scheduler import RoomScheduler, SchedulerOptions
+from .send_queue import SendOptions, SendPriority, SendQueue
+from .session import ConnectionOptions, SessionPool
+from .store import StoreOptions, SyncStore
+from .single_flight import SingleFlight
+from .sync import SyncCadence, SyncOptions
+from .sync_filter import build_filter
+
+
+def _event_model(event: dict) -> Type[Event]:
+    """Return the model class a raw event is built into."""
+    content = event.get("content")
+    if not isinstance(content, dict):
+        # Not much of a message or redaction without content
+        return Event
+    match event["type"]:
+        case "m.room.message":
+            relates_to = content.get("m.relates_to")
+            if (
+                isinstance(relates_to, dict)
+                and relates_to.get("rel_type") == "m.replace"
+            ):
+                return MessageEditEvent
+            return MessageEvent
+        case "m.room.redaction":
+            return RedactionEvent
+        case _:
+            return Event
+
+
+def _relates_to(event: dict, model: Type[Event]) -> str | None:
+    """Return the ID of the event an edit or a redaction applies to."""
+    related = None
+    if model is MessageEditEvent:
+        related = event["content"]["m.relates_to"].get("event_id")
+    elif model is RedactionEvent:
+        related = event["content"].get("redacts")
+    return related if isinstance(related, str) else None
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
 
 
 class Client:
     """Represents a client for the bot."""
 
-    def __init__(self, homeserver_url: str) -> None:
+    def __init__(
+        self,
+        homeserver_url: str,
+        connection_options: ConnectionOptions | None = None,
+        retention_policy: RetentionPolicy | None = None,
+        sync_options: SyncOptions | None = None,
+        queue_options: QueueOptions | None = None,
+        scheduler_options: SchedulerOptions | None = None,
+        json_codec: JSONCodec | None = None,
+        compact_models: bool = False,
+        profile_cache_options: ProfileCacheOptions | None = None,
+        response_cache_options: ResponseCacheOptions | None = None,
+        rate_limit_options: RateLimitOptions | None = None,
+        retry_options: RetryOptions | None = None,
+        send_options: SendOptions | None = None,
+        store_options: StoreOptions | None = None,
+        credentials: Credentials | None = None,
+        credentials_path: str | None = None,
+    ) -> None:
+        """Create a client.
+
+        With `compact_models` set, events don't keep their raw JSON
+        around, only the parsed fields and content, to save memory. With
+        `store_options`, the sync token, room state and recent timelines
+        are saved to disk, so that a restarted client picks up where it
+        left off instead of doing a full initial sync. Likewise, with a
+        `credentials_path`, the access token is saved and reused instead
+        of logging in with the password on every start.
+        """
         self.homeserver_url = homeserver_url
-        self.authentication = Authentication(homeserver_url)
+        self.compact_models = compact_models
+        self.json_codec = json_codec or get_codec()
+        self.session_pool = SessionPool(connection_options)
+        self.authentication = Authentication(
+            homeserver_url,
+            self.session_pool,
+            self.json_codec,
+            credentials,
+            credentials_path,
+        )
+        self.response_cache = ResponseCache(response_cache_options)
+        self._requests: SingleFlight[tuple, dict] = SingleFlight()
+        self.rate_limiter = RateLimiter(rate_limit_options)
+        self.retry_policy = RetryPolicy(retry_options)
+        self.send_queue = SendQueue(self._put_event, send_options)
 
         self.next_batch = ""
-        self.processed_event_ids: set[str] = set()
-        self.events: list[Event] = []
+        self.sync_options = sync_options or SyncOptions()
+        self.sync_cadence = SyncCadence(self.sync_options)
+        self.store = (
+            SyncStore(store_options, self.json_codec) if store_options else None
+        )
+        self._filter_ids: dict[str, str] = {}
+        self._filter_version: int | None = None
+        self._filter_id: str | None = None
+        # Timeline events handled since the event loop last got to run
+        self._unyielded = 0
+        self._user_id: str | None = None
+        self.events = EventStore(retention_policy, self.build_event)
+        self.processed_event_ids = self.events.processed_ids
         self.new_events: list[Event] = []
 
-        self.room_evt_queues: dict[str, asyncio.Queue[Event]] = {}
+        self.event_queues = EventQueues(queue_options)
         self.event_observer = EventDispatcher()
+        self.scheduler = RoomScheduler(
+            self.event_queues, self.event_observer.dispatch, scheduler_options
+        )
+
+        self.room_state: dict[str, RoomState] = {}
+        self._rooms: dict[str, Room] = {}
+        self.profile_cache = ProfileCache(profile_cache_options)
+        self._profile_requests: SingleFlight[str, dict | None] = SingleFlight()
 
-        self.room_state: dict[str, dict] = {}
+    @property
+    def circuit_state(self) -> CircuitState:
+        """Return whether requests to the homeserver are going through."""
+        return self.retry_policy.breaker.state
 
     @property
     def on(self) -> ObserverFactory:
@@ -42,58 +172,139 @@ class Client:
 
     def get_event(self, event_id: str) -> Event | None:
         """Get an event."""
-        for event in self.events + self.new_events:
-            if event.event_id == event_id:
-                return event
-        return None
+        return self.events.get(event_id)
 
     async def login(self, username: str, password: str) -> None:
-        """Login to the homeserver."""
-        await self.authentication.password_auth(username, password)
+        """Login to the homeserver, reusing the saved token if it's valid."""
+        await self.authentication.login(username, password)
+        if self.authentication.credentials is not None:
+            self._user_id = self.authentication.credentials.user_id
 
     async def get_token(self) -> str:
         """Return the token."""
         return await self.authentication.get_token()
 
     async def _request(self, method: str, endpoint: str, **kwargs) -> dict:
-        """Make a request to the homeserver."""
-        async with aiohttp.ClientSession() as session:
+        """Make a request to the homeserver.
+
+        Identical idempotent requests made at the same time share a single
+        response, and endpoints marked cacheable are answered from the
+        response cache while fresh; error responses are never cached.
+        Shared responses must not be mutated.
+        """
+        if method not in IDEMPOTENT_METHODS or "data" in kwargs or "json" in kwargs:
+            return await self._send_request(method, endpoint, **kwargs)
+        params = kwargs.get("params") or {}
+        key = (
+            method,
+            endpoint,
+            tuple(sorted(params.items())) if isinstance(params, dict) else params,
+        )
+        ttl = self.response_cache.ttl(endpoint)
+        if ttl is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        response = await self._requests.run(
+            key, lambda: self._send_request(method, endpoint, **kwargs)
+        )
+        if ttl is not None and "errcode" not in response:
+            self.response_cache.set(key, response, ttl)
+        return response
+
+    async def _send_request(self, method: str, endpoint: str, **kwargs) -> dict:
+        """Send a single request to the homeserver.
+
+        Requests go through the rate limiter. When the server rate limits
+        us anyway, the whole endpoint class backs off for as long as it
+        asks and the request is retried, up to `max_retries` times, after
+        which the error response is returned like any other. Connection
+        errors, timeouts and 5xx responses are retried by the retry
+        policy until the request's `deadline`, in seconds, passes. An
+        expired access token is refreshed once and the request retried.
+        """
+        deadline = kwargs.pop("deadline", None)
+        headers = kwargs.pop("headers", {})
+        if "json" in kwargs:
+            kwargs["data"] = self.json_codec.dumps(kwargs.pop("json"))
+            headers["Content-Type"] = "application/json"
+        endpoint_class = classify(method, endpoint)
+
+        async def attempt() -> tuple[int, Mapping[str, str], dict]:
+            session = await self.session_pool.get()
             async with session.request(
                 method,
                 f"{self.homeserver_url}/{endpoint}",
-                headers=kwargs.pop("headers", {})
-                | {"Authorization": f"Bearer {await self.get_token()}"},
+                headers=headers,
                 **kwargs,
             ) as response:
-                if response.status == 429:
-                    time = int(response.headers["Retry-After"])
-                    await asyncio.sleep(time)
-                    return await self._request(method, endpoint, **kwargs)
-                return await response.json()
+                body = await response.read()
+                if response.status >= 500:
+                    raise ServerError(response.status, body)
+                data = self.json_codec.loads(body) if body else {}
+                return response.status, response.headers, data
+
+        refreshed = False
+        for _ in range(self.rate_limiter.options.max_retries + 1):
+            headers["Authorization"] = f"Bearer {await self.get_token()}"
+            # Waiting on the rate limit happens before the retry policy
+            # starts the clock, so being rate limited never counts against
+            # the deadline or as the homeserver failing
+            await self.rate_limiter.acquire(endpoint_class)
+            status, response_headers, data = await self.retry_policy.run(
+                attempt, idempotent=method in RETRYABLE_METHODS, deadline=deadline
+            )
+            if status == 401 and data.get("errcode") == "M_UNKNOWN_TOKEN":
+                if not refreshed:
+                    refreshed = True
+                    if await self.authentication.refresh():
+                        continue
+            if status != 429:
+                return data
+            self.rate_limiter.throttle(
+                endpoint_class, retry_after(response_headers, data)
+            )
+        return data
 
     async def _download_mxc(self, mxc: str) -> bytes:
         """Download an mxc."""
         server_name, media_id = mxc[6:].split("/")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self.homeserver_url}/_matrix/media/v3/download/{server_name}/{media_id}",
-                headers={"Authorization": f"Bearer {await self.get_token()}"},
-            ) as response:
-                return await response.read()
+        await self.rate_limiter.acquire(EndpointClass.MEDIA)
+        session = await self.session_pool.get()
+        async with session.get(
+            f"{self.homeserver_url}/_matrix/media/v3/download/{server_name}/{media_id}",
+            headers={"Authorization": f"Bearer {await self.get_token()}"},
+        ) as response:
+            return await response.read()
+
+    async def _send_event(
+        self,
+        room_id: str,
+        event_type: str,
+        content: dict,
+        priority: SendPriority = SendPriority.NORMAL,
+    ) -> str:
+        """Send an event to a room through the send queue, returning its ID."""
+        return await self.send_queue.submit(room_id, event_type, content, priority)
 
-    async def _send_event(self, room_id: str, event_type: str, content: dict) -> None:
-        """Send an event to a room."""
-        await self._request(
+    async def _put_event(self, room_id: str, event_type: str, content: dict) -> str:
+        """Send an event to a room right away, returning its ID."""
+        # Generated once, so retries of the request can be deduplicated
+        txn_id = uuid.uuid4().hex
+        response = await self._request(
             "PUT",
-            f"_matrix/client/v3/rooms/{room_id}/send/{event_type}/{uuid.uuid4()}",
+            f"_matrix/client/v3/rooms/{room_id}/send/{event_type}/{txn_id}",
             json=content,
         )
+        if "event_id" not in response:
+            raise ValueError(f"Could not send event: {response.get('error')}")
+        return response["event_id"]
 
     async def send_text_message(
         self, room_id: str, content: str, reply_to: str | None = None
-    ) -> None:
-        """Send a text message to a room."""
-        await self._send_event(
+    ) -> str:
+        """Send a text message to a room, returning its event ID."""
+        return await self._send_event(
             room_id,
             "m.room.message",
             {
@@ -110,9 +321,12 @@ class Client:
 
     async def send_redaction(
         self, room_id: str, event_id: str, reason: str | None = None
-    ) -> None:
-        """Send a redaction to a room."""
-        await self._send_event(
+    ) -> str:
+        """Send a redaction to a room, returning its event ID.
+
+        Redactions skip ahead of the messages queued for sending.
+        """
+        return await self._send_event(
             room_id,
             "m.room.redaction",
             {
@@ -123,6 +337,7 @@ class Client:
                 "redacts": event_id,
                 "reason": reason,
             },
+            SendPriority.HIGH,
         )
 
     async def whoami(self) -> Myself:
@@ -134,137 +349,381 @@ class Client:
             user_id=user.get("user_id"),
         )
 
-    async def get_user(self, user_id: str) -> User | None:
-        """Get information about a user."""
+    async def _fetch_profile(self, user_id: str) -> dict | None:
+        """Fetch a user's profile and cache it, unless the lookup failed."""
         user = await self._request("GET", f"_matrix/client/v3/profile/{user_id}")
-        if not user:
+        if not user or "errcode" in user:
             return None
+        profile = {
+            "displayname": user.get("displayname"),
+            "avatar_url": user.get("avatar_url"),
+        }
+        self.profile_cache.set(user_id, profile)
+        return profile
+
+    async def get_user(self, user_id: str) -> User | None:
+        """Get information about a user.
+
+        Profiles come from the cache when possible, which is also filled
+        from the member events seen in sync. Concurrent lookups of the
+        same user share a single request.
+        """
+        profile = self.profile_cache.get(user_id)
+        if profile is None:
+            profile = await self._profile_requests.run(
+                user_id, lambda: self._fetch_profile(user_id)
+            )
+        if profile is None:
+            return None
+        return self._user_from_profile(user_id, profile)
+
+    async def get_users(
+        self,
+        user_ids: Iterable[str],
+        *,
+        room_id: str | None = None,
+        concurrency: int = 10,
+    ) -> AsyncIterator[User]:
+        """Get information about many users, yielding them as they resolve.
+
+        Cached profiles come first. If `room_id` is given, the room's
+        joined members are then fetched in a single request, and whatever
+        is still missing is fetched with at most `concurrency` profile
+        requests at a time. Users without a profile are skipped.
+        """
+        remaining: list[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            profile = self.profile_cache.get(user_id)
+            if profile is None:
+                remaining.append(user_id)
+            else:
+                yield self._user_from_profile(user_id, profile)
+
+        if room_id is not None and remaining:
+            response = await self._request(
+                "GET", f"_matrix/client/v3/rooms/{room_id}/joined_members"
+            )
+            joined = response.get("joined", {})
+            missing: list[str] = []
+            for user_id in remaining:
+                member = joined.get(user_id)
+                if member is None:
+                    missing.append(user_id)
+                    continue
+                profile = {
+                    "displayname": member.get("display_name"),
+                    "avatar_url": member.get("avatar_url"),
+                }
+                self.profile_cache.set(user_id, profile)
+                yield self._user_from_profile(user_id, profile)
+            remaining = missing
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(user_id: str) -> User | None:
+            async with semaphore:
+                return await self.get_user(user_id)
+
+        for lookup in asyncio.as_completed([fetch(user_id) for user_id in remaining]):
+            user = await lookup
+            if user is not None:
+                yield user
+
+    def _user_from_profile(self, user_id: str, profile: dict) -> User:
+        """Build a user from a profile dict."""
         return User(
             self,
             user_id=user_id,
-            displayname=user.get("displayname"),
-            avatar_url=user.get("avatar_url"),
+            displayname=profile.get("displayname"),
+            avatar_url=profile.get("avatar_url"),
         )
 
     def get_room(self, room_id: str) -> Room | None:
-        """Get information about a room."""
-        return Room(self, room_id, state=self.room_state.get(room_id, {}))
+        """Get information about a room.
 
-    async def handle_message_event(self, room_id: str, event: dict) -> None:
-        """Handle a message event."""
-        if (
-            event.get("content", {}).get("m.relates_to", {}).get("rel_type")
-            == "m.replace"
-        ):
-            edit = MessageEditEvent(
-                self,
-                event["type"],
-                event,
-                event["sender"],
-                room_id,
-                event["unsigned"]["age"],
-                event["event_id"],
-                None,
-                event["content"],
-            )
-            self.new_events.append(edit)
-            if edit.original:
-                edit.original.edits.append(edit)
-        else:
-            self.new_events.append(
-                MessageEvent(
-                    self,
-                    event["type"],
-                    event,
-                    event["sender"],
-                    room_id,
-                    event["unsigned"]["age"],
-                    event["event_id"],
-                    None,
-                    event["content"],
-                )
-            )
+        The same Room is returned for a room ID every time, backed by the
+        live room state.
+        """
+        room = self._rooms.get(room_id)
+        if room is None:
+            state = self.room_state.get(room_id)
+            if state is None:
+                state = self.room_state[room_id] = RoomState()
+            room = self._rooms[room_id] = Room(self, room_id, state=state)
+        return room
 
-    async def handle_redaction_event(self, room_id: str, event: dict) -> None:
-        """Handle a redaction event."""
-        redaction = RedactionEvent(
+    def build_event(self, record: EventRecord) -> Event:
+        """Build the model of a stored event record."""
+        fields = (
             self,
-            event["type"],
-            event,
-            event["sender"],
-            room_id,
-            event["unsigned"]["age"],
-            event["event_id"],
+            record.type,
+            record.raw,
+            record._sender,
+            record._room,
+            record._age,
+            record.event_id,
             None,
-            event["content"],
         )
-        self.new_events.append(redaction)
-        if redaction.redacts:
-            redaction.redacts.redacted = redaction
+        content = record.content
+        if content is None:
+            return Event(*fields)
+        if record.model is MessageEvent:
+            return MessageEvent(*fields, content)
+        if record.model is MessageEditEvent:
+            return MessageEditEvent(*fields, content)
+        if record.model is RedactionEvent:
+            return RedactionEvent(*fields, content)
+        return Event(*fields)
 
-    async def handle_event(self, room_id: str, event: dict) -> None:
-        """Handle an event."""
-        if event["event_id"] in self.processed_event_ids:
+    async def handle_event(
+        self, room_id: str, event: dict, *, dispatch: bool = True
+    ) -> None:
+        """Handle an event.
+
+        The event is only stored as a record; its model is built when an
+        observer wants it (and `dispatch` is set) or when it's looked up.
+        """
+        # The processed IDs are only a window, so an event that is still
+        # stored counts as processed even after the window moved past it
+        if (
+            event["event_id"] in self.processed_event_ids
+            or event["event_id"] in self.events
+        ):
             return
         self.processed_event_ids.add(event["event_id"])
-        match event["type"]:
-            case "m.room.message":
-                await self.handle_message_event(room_id, event)
-            case "m.room.redaction":
-                await self.handle_redaction_event(room_id, event)
-            case _:
-                self.new_events.append(
-                    Event(
-                        self,
-                        event["type"],
-                        event,
-                        event["sender"],
-                        room_id,
-                        event["unsigned"]["age"],
-                        event["event_id"],
-                        None,
-                    )
-                )
+        model = _event_model(event)
+        record = EventRecord(
+            event["event_id"],
+            sys.intern(event["type"]),
+            room_id,
+            sys.intern(event["sender"]),
+            event["unsigned"]["age"],
+            None if model is Event else event["content"],
+            None if self.compact_models else event,
+            model,
+        )
+        self.events.add(record, relates_to=_relates_to(event, model))
+        if dispatch and self.event_observer.wants(model, room_id):
+            self.new_events.append(
+                self.events.get(record.event_id) or self.build_event(record)
+            )
 
-    async def sync(self) -> None:
-        """Sync with the homeserver."""
-        is_initial = not self.next_batch
-        self.new_events.clear()
+    async def get_filter_id(self) -> str | None:
+        """Return the ID of the sync filter for the current observers.
+
+        The filter is only uploaded again when the observers change in a
+        way that changes the filter itself.
+        """
+        if not self.sync_options.filter_from_observers:
+            return None
+        if self._filter_version == self.event_observer.version:
+            return self._filter_id
+        version = self.event_observer.version
+        sync_filter = build_filter(
+            self.event_observer.subscriptions, self.sync_options.timeline_limit
+        )
+        definition = json.dumps(sync_filter, sort_keys=True)
+        filter_id = self._filter_ids.get(definition)
+        if filter_id is None:
+            if self._user_id is None:
+                self._user_id = (await self.whoami()).user_id
+            response = await self._request(
+                "POST",
+                f"_matrix/client/v3/user/{self._user_id}/filter",
+                json=sync_filter,
+            )
+            filter_id = response.get("filter_id")
+            if filter_id is None:
+                return None
+            self._filter_ids[definition] = filter_id
+        self._filter_version = version
+        self._filter_id = filter_id
+        return filter_id
+
+    async def fetch_sync(self) -> dict:
+        """Fetch the next sync response and advance the sync token."""
+        # The initial sync returns straight away anyway, so there is
+        # nothing to wait for
+        timeout = 0 if not self.next_batch else self.sync_cadence.timeout
+        params = {"timeout": str(timeout)}
+        if self.next_batch:
+            params["since"] = self.next_batch
+        filter_id = await self.get_filter_id()
+        if filter_id is not None:
+            params["filter"] = filter_id
         response = await self._request(
             "GET",
             "_matrix/client/v3/sync",
-            params=self.next_batch and {"since": self.next_batch},
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=timeout / 1000 + 30),
+            deadline=timeout / 1000 + self.retry_policy.options.deadline,
         )
         self.next_batch = response.get("next_batch", "")
+        return response
+
+    async def handle_timeline(
+        self, room_id: str, events: list[dict], *, dispatch: bool = True
+    ) -> list[Event]:
+        """Handle a room's timeline, returning the events to dispatch in order."""
+        start = len(self.new_events)
+        for event in events:
+            await self.handle_event(room_id, event, dispatch=dispatch)
+            self._unyielded += 1
+            if self._unyielded >= self.sync_options.yield_every:
+                self._unyielded = 0
+                await asyncio.sleep(0)
+        return self.new_events[start:]
+
+    async def process_sync(self, response: dict, is_initial: bool) -> None:
+        """Process a sync response and queue its events for the observers.
+
+        Each room's events are queued as soon as the room is processed,
+        and the event loop gets a chance to run every few events, so the
+        observers of a room don't wait for the rest of a large sync.
+        """
+        self.new_events.clear()
+        received = 0
         for room_id, room in response.get("rooms", {}).get("join", {}).items():
-            self.room_state[room_id] = room.get("state", {})
-            for event in room.get("timeline", {}).get("events", []):
-                await self.handle_event(room_id, event)
-        self.events.extend(self.new_events)
-        if not is_initial:
-            for event in self.new_events:
-                queue = self.room_evt_queues.get(event._room)
-                if queue is None:
-                    queue = self.room_evt_queues[event._room] = asyncio.Queue()
-                    asyncio.create_task(self.run_event_observers(event._room))
-                await queue.put(event)
+            # Room IDs, senders and event types repeat across many events,
+            # so every event shares a single copy of each
+            room_id = sys.intern(room_id)
+            state = self.room_state.get(room_id)
+            if state is None:
+                state = self.room_state[room_id] = RoomState()
+            timeline = room.get("timeline", {}).get("events", [])
+            for event in (*room.get("state", {}).get("events", []), *timeline):
+                if not state.apply(event):
+                    continue
+                if event["type"] == "m.room.member":
+                    self.profile_cache.update_from_member(event)
+                if self.store is not None:
+                    self.store.record_state(room_id, event)
+            if self.store is not None:
+                self.store.record_timeline(room_id, timeline)
+            events = await self.handle_timeline(
+                room_id, timeline, dispatch=not is_initial
+            )
+            for event in events:
+                await self.event_queues.put(event)
+                self.scheduler.notify(room_id)
+            received += len(timeline)
+        self.sync_cadence.record(received)
         self.new_events = []
+        if self.store is not None and "next_batch" in response:
+            self.store.record_sync(response["next_batch"])
+
+    async def restore(self) -> bool:
+        """Load the stored snapshot, returning whether there was one.
+
+        Stored timeline events are marked as handled without reaching
+        the observers, so they aren't dispatched again.
+        """
+        if self.store is None:
+            return False
+        snapshot = await self.store.load()
+        for room_id, events in snapshot.state.items():
+            room_id = sys.intern(room_id)
+            state = self.room_state.get(room_id)
+            if state is None:
+                state = self.room_state[room_id] = RoomState()
+            for event in events:
+                state.apply(event)
+        for room_id, events in snapshot.timeline.items():
+            await self.handle_timeline(sys.intern(room_id), events, dispatch=False)
+        self.new_events = []
+        if snapshot.next_batch:
+            self.next_batch = snapshot.next_batch
+        return bool(snapshot.next_batch)
+
+    async def sync(self) -> None:
+        """Sync with the homeserver."""
+        is_initial = not self.next_batch
+        response = await self.fetch_sync()
+        await self.process_sync(response, is_initial)
 
-    async def run_event_observers(self, room_id: str) -> None:
-        """Run the event observers."""
-        while True:
-            event = await self.room_evt_queues[room_id].get()
-            await self.event_observer.dispatch(event)
+    async def _sync_backoff(self, failures: int) -> None:
+        """Wait before syncing again after the homeserver failed us."""
+        await asyncio.sleep(
+            max(
+                self.retry_policy.breaker.retry_in(),
+                self.retry_policy.backoff(failures),
+            )
+        )
+
+    async def _fetch_syncs(
+        self, responses: asyncio.Queue[tuple[dict, bool] | Exception]
+    ) -> None:
+        """Keep fetching sync responses into a queue."""
+        failures = 0
+        try:
+            while True:
+                await self.sync_cadence.wait()
+                is_initial = not self.next_batch
+                try:
+                    response = await self.fetch_sync()
+                except (*TRANSIENT_ERRORS, CircuitOpenError):
+                    failures += 1
+                    await self._sync_backoff(failures)
+                    continue
+                failures = 0
+                await responses.put((response, is_initial))
+        except Exception as error:
+            # Hand the error over so that mainloop fails like it used to
+            await responses.put(error)
 
     async def mainloop(self) -> None:
-        """Start the client."""
-        while True:
-            await self.sync()
+        """Start the client.
+
+        Syncs that fail because the homeserver is unreachable or erroring
+        are retried with backoff instead of stopping the client. When
+        pipelining is enabled, the next sync request is sent as soon
+        as the previous response arrives, while that response is still
+        being processed. Responses are processed one at a time and in
+        order, so events within a room keep their order. A stored
+        snapshot, if any, is restored first.
+        """
+        if self.store is not None and not self.next_batch:
+            await self.restore()
+        if not self.sync_options.pipelined:
+            failures = 0
+            while True:
+                await self.sync_cadence.wait()
+                try:
+                    await self.sync()
+                except (*TRANSIENT_ERRORS, CircuitOpenError):
+                    failures += 1
+                    await self._sync_backoff(failures)
+                else:
+                    failures = 0
+
+        responses: asyncio.Queue[tuple[dict, bool] | Exception] = asyncio.Queue(
+            maxsize=self.sync_options.pipeline_depth
+        )
+        fetcher = asyncio.create_task(self._fetch_syncs(responses))
+        try:
+            while True:
+                item = await responses.get()
+                if isinstance(item, Exception):
+                    raise item
+                await self.process_sync(*item)
+        finally:
+            fetcher.cancel()
+
+    async def close(self) -> None:
+        """Stop the workers, save the store and close the HTTP connections."""
+        await self.scheduler.stop()
+        await self.send_queue.stop()
+        await self.session_pool.close()
+        if self.store is not None:
+            await self.store.close()
 
     async def run_forever(self, username: str, password: str) -> None:
         """Run the client forever."""
-        await self.login(username, password)
-        await self.mainloop()
+        try:
+            await self.login(username, password)
+            await self.mainloop()
+        finally:
+            await self.close()
 
     def run(self, username: str, password: str) -> None:
         """Run the client."""
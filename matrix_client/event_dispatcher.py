@@ -1,17 +1,17 @@
 from __future__ import annotations
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import functools
 import traceback
-from typing import Awaitable, Callable, Generic, Protocol, Type, TypeGuard, TypeVar
+from typing import Awaitable, Callable, Generic, Type, TypeVar
 
 from .models import Event
 
 
 T = TypeVar("T", bound=Event)
-U = TypeVar("U", bound=Event)
 
 
-@dataclass
+@dataclass(slots=True)
 class Context(Generic[T]):
     """A context for an event."""
 
@@ -19,92 +19,163 @@ class Context(Generic[T]):
     unsubscribe: Callable[[], None]
 
 
-class ContextTypeChecker(Generic[U, T]):
-    """A protocol for checking the type of a context."""
+@dataclass(frozen=True)
+class Subscription:
+    """What an observer is subscribed to."""
 
-    def __init__(self, type_: Type[T]) -> None:
-        self.type_ = type_
+    on: Type[Event] | None
+    room: str | None
 
-    def check(self, context: Context[U]) -> TypeGuard[Context[T]]:
-        """Check the type of a context."""
-        return isinstance(context.event, self.type_)
 
+@dataclass(slots=True, eq=False)
+class Registration:
+    """A registered observer, with everything dispatch needs precomputed."""
 
-class Filter(Protocol[T]):
-    """A filter for an event."""
-
-    async def __call__(self, context: Context[T]) -> None:
-        """Handle an event if it passes the filter."""
-
-
-class RoomFilter(Filter[T]):
-    """A room event filter."""
-
-    def __init__(
-        self, room_id: str, callback: Callable[[Context[T]], Awaitable[None]]
-    ) -> None:
-        self.room_id = room_id
-        self.callback = callback
-
-    async def __call__(self, context: Context[T]) -> None:
-        """Handle an event if it is in the room."""
-        if context.event._room == self.room_id:
-            await self.callback(context)
-
-
-class OneTimeFilter(Filter[T]):
-    """A one-time event filter."""
-
-    def __init__(self, callback: Callable[[Context[T]], Awaitable[None]]) -> None:
-        self.callback = callback
-
-    async def __call__(self, context: Context[T]) -> None:
-        """Handle an event if it has not been called before."""
-        await self.callback(context)
-        context.unsubscribe()
-
-
-class EventTypeFilter(Filter[T], Generic[T, U]):
-    """A filter that filters by event type."""
-
-    def __init__(
-        self, type_: Type[U], callback: Callable[[Context[U]], Awaitable[None]]
-    ) -> None:
-        self.type_ = type_
-        self.callback = callback
-
-    async def __call__(self, context: Context[T]) -> None:
-        """Handle an event if it is of the correct type."""
-        if ContextTypeChecker[T, U](self.type_).check(context):
-            await self.callback(context)
+    observer: Callable
+    subscription: Subscription
+    order: int
+    once: bool
+    pass_context: bool
+    unsubscribe: Callable[[], None] = field(init=False)
 
 
 class EventDispatcher:
     """EventDispatcher class - implements a simple observer pattern
-    for Matrix events."""
-
-    def __init__(self) -> None:
-        self._observers: list[Callable[[Context[Event]], Awaitable[None]]] = []
+    for Matrix events.
 
-    def register(self, observer: Callable[[Context[Event]], Awaitable[None]]) -> None:
-        """Register an observer."""
-        self._observers.append(observer)
+    Observers are indexed by the model class and the room they were
+    registered for, so dispatching an event only touches the observers
+    that actually match it. Everything an observer needs at dispatch time,
+    including its unsubscribe handle, is prepared once at registration.
+    """
 
-    def unregister(self, observer: Callable[[Context[Event]], Awaitable[None]]) -> None:
+    def __init__(self) -> None:
+        self._registrations: dict[Callable, list[Registration]] = {}
+        self._routes: dict[
+            Type[Event] | None, dict[str | None, list[Registration]]
+        ] = {}
+        self._registered = 0
+        self.version = 0
+
+    @property
+    def subscriptions(self) -> list[Subscription]:
+        """Return what the registered observers are subscribed to."""
+        return [
+            registration.subscription
+            for registrations in self._registrations.values()
+            for registration in registrations
+        ]
+
+    def register(
+        self,
+        observer: Callable[[Context[Event]], Awaitable[None]]
+        | Callable[[Event], Awaitable[None]],
+        *,
+        on: Type[Event] | None = None,
+        room: str | None = None,
+        once: bool = False,
+        pass_context: bool = True,
+    ) -> Registration:
+        """Register an observer.
+
+        The observer only receives events that are instances of `on` and
+        that happened in `room`; leaving either as None matches everything.
+        With `once` set it is unregistered after handling its first event.
+        Without `pass_context` it is called with the bare event, which
+        saves building a context for it.
+        """
+        registration = Registration(
+            observer=observer,
+            subscription=Subscription(on=on, room=room),
+            order=self._registered,
+            once=once,
+            pass_context=pass_context,
+        )
+        registration.unsubscribe = functools.partial(self._remove, registration)
+        self._registrations.setdefault(observer, []).append(registration)
+        self._routes.setdefault(on, {}).setdefault(room, []).append(registration)
+        self._registered += 1
+        self.version += 1
+        return registration
+
+    def unregister(
+        self,
+        observer: Callable[[Context[Event]], Awaitable[None]]
+        | Callable[[Event], Awaitable[None]],
+    ) -> None:
         """Unregister an observer."""
-        self._observers.remove(observer)
+        registrations = self._registrations.get(observer)
+        if registrations:
+            self._remove(registrations[0])
+
+    def _remove(self, registration: Registration) -> None:
+        """Remove a single registration, if it is still registered."""
+        registrations = self._registrations.get(registration.observer)
+        if registrations is None or registration not in registrations:
+            return
+        registrations.remove(registration)
+        if not registrations:
+            del self._registrations[registration.observer]
+        subscription = registration.subscription
+        rooms = self._routes[subscription.on]
+        rooms[subscription.room].remove(registration)
+        if not rooms[subscription.room]:
+            del rooms[subscription.room]
+        if not rooms:
+            del self._routes[subscription.on]
+        self.version += 1
+
+    def wants(self, model: Type[Event], room_id: str) -> bool:
+        """Return whether any observer would receive such an event."""
+        for type_ in (*model.__mro__, None):
+            rooms = self._routes.get(type_)
+            if rooms is not None and (room_id in rooms or None in rooms):
+                return True
+        return False
+
+    def registrations_for(self, event: Event) -> list[Registration]:
+        """Return the registrations matching an event, in registration order."""
+        matches: list[Registration] = []
+        routes = self._routes
+        for type_ in (*type(event).__mro__, None):
+            rooms = routes.get(type_)
+            if rooms is None:
+                continue
+            if event._room in rooms:
+                matches.extend(rooms[event._room])
+            if None in rooms:
+                matches.extend(rooms[None])
+        if len(matches) > 1:
+            matches.sort(key=_registration_order)
+        return matches
+
+    async def _notify(self, registration: Registration, event: Event) -> None:
+        """Call a single observer."""
+        if registration.pass_context:
+            await registration.observer(Context(event, registration.unsubscribe))
+        else:
+            await registration.observer(event)
+        if registration.once:
+            registration.unsubscribe()
 
     async def dispatch(self, event: Event) -> None:
+        registrations = self.registrations_for(event)
+        if not registrations:
+            return
         try:
-            await asyncio.gather(
-                *(
-                    observer(
-                        Context(
-                            event=event, unsubscribe=lambda: self.unregister(observer)
-                        )
+            if len(registrations) == 1:
+                # No need for gather and its tasks with a single observer
+                await self._notify(registrations[0], event)
+            else:
+                await asyncio.gather(
+                    *(
+                        self._notify(registration, event)
+                        for registration in registrations
                     )
-                    for observer in self._observers
-                ),
-            )
+                )
         except Exception:
             traceback.print_exc()
+
+
+def _registration_order(registration: Registration) -> int:
+    return registration.order
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import enum
+import time
+
+from .models import Event, MessageEditEvent
+
+
+class OverflowPolicy(enum.Enum):
+    """What to do with a new event when a queue is full."""
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    COALESCE_EDITS = "coalesce_edits"
+
+
+@dataclass
+class QueueOptions:
+    """Bounds of the queues between sync and the observers.
+
+    BLOCK pauses processing the sync until the observers catch up.
+    COALESCE_EDITS replaces a queued edit of the same message with the
+    newer one, and blocks when there is nothing to replace.
+    """
+
+    max_room_size: int | None = 1_000
+    max_total_size: int | None = 10_000
+    room_overflow: OverflowPolicy = OverflowPolicy.BLOCK
+    total_overflow: OverflowPolicy = OverflowPolicy.BLOCK
+
+
+@dataclass
+class QueueStats:
+    """Metrics of the event queues."""
+
+    depth: int
+    rooms: int
+    max_room_depth: int
+    enqueued: int
+    dequeued: int
+    dropped: int
+    coalesced: int
+    total_wait: float
+    max_wait: float
+
+    @property
+    def average_wait(self) -> float:
+        """Return the average time an event spent queued, in seconds."""
+        return self.total_wait / self.dequeued if self.dequeued else 0.0
+
+
+class EventQueues:
+    """Bounded per-room FIFO queues of events waiting for the observers."""
+
+    def __init__(self, options: QueueOptions | None = None) -> None:
+        self.options = options or QueueOptions()
+        self._rooms: dict[str, deque[tuple[float, Event]]] = {}
+        self._space = asyncio.Event()
+        self._size = 0
+        self._enqueued = 0
+        self._dequeued = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depth(self, room_id: str) -> int:
+        """Return the number of events queued for a room."""
+        return len(self._rooms.get(room_id, ()))
+
+    async def put(self, event: Event) -> None:
+        """Queue an event, applying the overflow policies when full."""
+        queue = self._rooms.setdefault(event._room, deque())
+        while True:
+            max_room_size = self.options.max_room_size
+            max_total_size = self.options.max_total_size
+            if max_room_size is not None and len(queue) >= max_room_size:
+                policy = self.options.room_overflow
+            elif max_total_size is not None and self._size >= max_total_size:
+                policy = self.options.total_overflow
+            else:
+                break
+
+            if policy is OverflowPolicy.DROP_OLDEST and self._drop_oldest(queue):
+                continue
+            if policy in (OverflowPolicy.DROP_NEWEST, OverflowPolicy.DROP_OLDEST):
+                # With nothing older queued, the new event is the oldest
+                self._dropped += 1
+                return
+            if policy is OverflowPolicy.COALESCE_EDITS and self._coalesce(
+                queue, event
+            ):
+                return
+            self._space.clear()
+            await self._space.wait()
+            # The room's queue may have been reaped while we waited
+            queue = self._rooms.setdefault(event._room, deque())
+
+        queue.append((time.monotonic(), event))
+        self._size += 1
+        self._enqueued += 1
+
+    def get_nowait(self, room_id: str) -> Event | None:
+        """Take the next event of a room, or None if there is none."""
+        queue = self._rooms.get(room_id)
+        if not queue:
+            return None
+        enqueued_at, event = queue.popleft()
+        self._size -= 1
+        self._dequeued += 1
+        wait = time.monotonic() - enqueued_at
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._space.set()
+        return event
+
+    def reap(self, room_id: str) -> None:
+        """Forget a room's queue if it is empty."""
+        if not self._rooms.get(room_id, True):
+            del self._rooms[room_id]
+
+    def stats(self) -> QueueStats:
+        """Return the current metrics of the queues."""
+        return QueueStats(
+            depth=self._size,
+            rooms=len(self._rooms),
+            max_room_depth=max(
+                (len(queue) for queue in self._rooms.values()), default=0
+            ),
+            enqueued=self._enqueued,
+            dequeued=self._dequeued,
+            dropped=self._dropped,
+            coalesced=self._coalesced,
+            total_wait=self._total_wait,
+            max_wait=self._max_wait,
+        )
+
+    def _drop_oldest(self, queue: deque[tuple[float, Event]]) -> bool:
+        """Drop the oldest event of a queue, or of the busiest room.
+
+        Returns False if there was nothing queued to drop.
+        """
+        if not queue:
+            queue = max(self._rooms.values(), key=len)
+            if not queue:
+                return False
+        queue.popleft()
+        self._size -= 1
+        self._dropped += 1
+        return True
+
+    def _coalesce(self, queue: deque[tuple[float, Event]], event: Event) -> bool:
+        """Replace a queued edit of the same message with a newer edit."""
+        if not isinstance(event, MessageEditEvent):
+            return False
+        original = event.content.get("m.relates_to", {}).get("event_id")
+        if original is None:
+            return False
+        for index, (enqueued_at, queued) in enumerate(queue):
+            if (
+                isinstance(queued, MessageEditEvent)
+                and queued.content.get("m.relates_to", {}).get("event_id") == original
+            ):
+                queue[index] = (enqueued_at, event)
+                self._coalesced += 1
+                return True
+        return False
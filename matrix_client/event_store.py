@@ -0,0 +1,242 @@
+from __future__ import annotations
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+import sys
+import time
+from typing import Callable, Iterator, Type
+
+from .models import Event, MessageEditEvent, MessageEvent, RedactionEvent
+
+
+@dataclass
+class RetentionPolicy:
+    """Limits on how much event history is kept in memory.
+
+    Any limit left as None is not enforced. With `lru` set, looking an
+    event up counts as using it, so the least recently used events are
+    evicted first instead of the oldest ones.
+    """
+
+    max_events: int | None = None
+    max_events_per_room: int | None = None
+    ttl: float | None = None
+    lru: bool = False
+    max_processed_ids: int | None = 100_000
+
+
+@dataclass
+class EventStoreStats:
+    """Memory metrics of an event store.
+
+    `lazy` is how many stored events are still only records, and
+    `materialized` how many records have been turned into models so far.
+    """
+
+    events: int
+    lazy: int
+    rooms: int
+    processed_ids: int
+    evicted: int
+    expired: int
+    materialized: int
+
+
+@dataclass(slots=True)
+class EventRecord:
+    """A received event whose model hasn't been built yet.
+
+    It only holds the fields its model is built from; `raw` is None
+    unless the model keeps the raw JSON, and `content` is None unless
+    the model has content.
+    """
+
+    event_id: str
+    type: str
+    _room: str
+    _sender: str
+    _age: int
+    content: dict | None
+    raw: dict | None
+    model: Type[Event]
+
+
+class SeenEventIds:
+    """A sliding window of the most recently processed event IDs."""
+
+    def __init__(self, maxlen: int | None = None) -> None:
+        self.maxlen = maxlen
+        self._ids: dict[str, None] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, event_id: object) -> bool:
+        return event_id in self._ids
+
+    def add(self, event_id: str) -> None:
+        """Remember an event ID, forgetting the oldest one if full."""
+        if event_id in self._ids:
+            return
+        self._ids[event_id] = None
+        if self.maxlen is not None and len(self._ids) > self.maxlen:
+            del self._ids[next(iter(self._ids))]
+
+
+class EventStore:
+    """An event history indexed by event ID and by room.
+
+    Events can be stored as lightweight records; their model is only
+    built, using `materialize`, the first time they are looked up. Edits
+    and redactions of a record are linked to it once it is built.
+    """
+
+    def __init__(
+        self,
+        policy: RetentionPolicy | None = None,
+        materialize: Callable[[EventRecord], Event] | None = None,
+    ) -> None:
+        self.policy = policy or RetentionPolicy()
+        self.materialize = materialize
+        self._events: OrderedDict[str, Event | EventRecord] = OrderedDict()
+        self._relations: dict[str, list[str]] = {}
+        self._lazy = 0
+        self._materialized = 0
+        self._rooms: dict[str, dict[str, None]] = {}
+        self.processed_ids = SeenEventIds(self.policy.max_processed_ids)
+        self._added: deque[tuple[float, str]] = deque()
+        self._evicted = 0
+        self._expired = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        for event_id in list(self._events):
+            event = self.get(event_id)
+            if event is not None:
+                yield event
+
+    def __contains__(self, event_id: object) -> bool:
+        return event_id in self._events
+
+    def add(self, event: Event | EventRecord, relates_to: str | None = None) -> None:
+        """Add an event to the store, evicting events to stay within limits.
+
+        `relates_to` is the ID of the event an edit or a redaction applies
+        to.
+        """
+        if event.event_id in self._events:
+            return
+        self._expire()
+        self._events[event.event_id] = event
+        if isinstance(event, EventRecord):
+            self._lazy += 1
+        room = self._rooms.setdefault(event._room, {})
+        room[event.event_id] = None
+        if self.policy.ttl is not None:
+            self._added.append((time.monotonic(), event.event_id))
+
+        if relates_to is not None:
+            target = self._events.get(relates_to)
+            if isinstance(target, EventRecord):
+                self._relations.setdefault(relates_to, []).append(event.event_id)
+            elif target is not None:
+                related = self.get(event.event_id)
+                if related is not None:
+                    _link(related, target)
+
+        max_per_room = self.policy.max_events_per_room
+        if max_per_room is not None:
+            while len(room) > max_per_room:
+                self._remove(next(iter(room)))
+                self._evicted += 1
+        if self.policy.max_events is not None:
+            while len(self._events) > self.policy.max_events:
+                self._remove(next(iter(self._events)))
+                self._evicted += 1
+
+    def extend(self, events: list[Event]) -> None:
+        """Add several events to the store."""
+        for event in events:
+            self.add(event)
+
+    def get(self, event_id: str) -> Event | None:
+        """Get an event by its ID, building its model if needed."""
+        self._expire()
+        event = self._events.get(event_id)
+        if event is None:
+            return None
+        if self.policy.lru:
+            self._events.move_to_end(event_id)
+        if isinstance(event, EventRecord):
+            if self.materialize is None:
+                raise ValueError("The store has no way to build event models.")
+            event = self._events[event_id] = self.materialize(event)
+            self._lazy -= 1
+            self._materialized += 1
+            for related_id in self._relations.pop(event_id, ()):
+                related = self.get(related_id)
+                if related is not None:
+                    _link(related, event)
+        return event
+
+    def room(self, room_id: str) -> list[Event]:
+        """Return the events of a room in the order they were received."""
+        self._expire()
+        event_ids = list(self._rooms.get(room_id, {}))
+        events = (self.get(event_id) for event_id in event_ids)
+        return [event for event in events if event is not None]
+
+    def stats(self) -> EventStoreStats:
+        """Return the current metrics of the store."""
+        return EventStoreStats(
+            events=len(self._events),
+            lazy=self._lazy,
+            rooms=len(self._rooms),
+            processed_ids=len(self.processed_ids),
+            evicted=self._evicted,
+            expired=self._expired,
+            materialized=self._materialized,
+        )
+
+    def memory_usage(self) -> int:
+        """Estimate the memory held by the store in bytes.
+
+        This walks every stored event, so it is meant for occasional
+        diagnostics rather than for the hot path.
+        """
+        size = sys.getsizeof(self._events) + sys.getsizeof(self._added)
+        for room in self._rooms.values():
+            size += sys.getsizeof(room)
+        for event in self._events.values():
+            size += sys.getsizeof(event) + sys.getsizeof(event.raw)
+        return size
+
+    def _remove(self, event_id: str) -> None:
+        event = self._events.pop(event_id)
+        if isinstance(event, EventRecord):
+            self._lazy -= 1
+        self._relations.pop(event_id, None)
+        room = self._rooms[event._room]
+        del room[event_id]
+        if not room:
+            del self._rooms[event._room]
+
+    def _expire(self) -> None:
+        if self.policy.ttl is None:
+            return
+        deadline = time.monotonic() - self.policy.ttl
+        while self._added and self._added[0][0] < deadline:
+            _, event_id = self._added.popleft()
+            if event_id in self._events:
+                self._remove(event_id)
+                self._expired += 1
+
+
+def _link(related: Event, target: Event) -> None:
+    """Apply an edit or a redaction to the event it relates to."""
+    if isinstance(related, MessageEditEvent):
+        if isinstance(target, MessageEvent):
+            target.edits.append(related)
+    elif isinstance(related, RedactionEvent):
+        target.redacted = related
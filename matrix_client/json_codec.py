@@ -0,0 +1,51 @@
+from __future__ import annotations
+from dataclasses import dataclass
+import json
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class JSONCodec:
+    """A JSON backend used for request and response bodies."""
+
+    name: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+STDLIB = JSONCodec("json", json.loads, _stdlib_dumps)
+
+CODECS: dict[str, JSONCodec] = {"json": STDLIB}
+
+try:
+    import msgspec
+except ImportError:
+    pass
+else:
+    CODECS["msgspec"] = JSONCodec("msgspec", msgspec.json.decode, msgspec.json.encode)
+
+try:
+    import orjson
+except ImportError:
+    pass
+else:
+    CODECS["orjson"] = JSONCodec("orjson", orjson.loads, orjson.dumps)
+
+
+def get_codec(name: str | None = None) -> JSONCodec:
+    """Return a codec by name, or the fastest one installed.
+
+    orjson is preferred, then msgspec, then the standard library.
+    """
+    if name is not None:
+        if name not in CODECS:
+            raise ValueError(f"JSON codec {name!r} is not available.")
+        return CODECS[name]
+    for preferred in ("orjson", "msgspec", "json"):
+        if preferred in CODECS:
+            return CODECS[preferred]
+    return STDLIB
@@ -6,7 +6,7 @@ if TYPE_CHECKING:
     from ..client import Client
 
 
-@dataclass
+@dataclass(slots=True)
 class Attachment:
     """Represents an attachment."""
 
@@ -11,12 +11,12 @@ if TYPE_CHECKING:
     from .redaction_event import RedactionEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class Event(Base):
     """Represents an event."""
 
     type: str
-    raw: dict = field(repr=False)
+    raw: dict | None = field(repr=False)
     _sender: str = field(repr=False)
     _room: str = field(repr=False)
     _age: int = field(repr=False)
@@ -40,12 +40,12 @@ class Event(Base):
         """Return the age."""
         return datetime.timedelta(milliseconds=self._age)
 
-    async def redact(self, reason: str | None = None) -> None:
-        """Redact the event."""
-        await self._client.send_redaction(self._room, self.event_id, reason)
+    async def redact(self, reason: str | None = None) -> str:
+        """Redact the event, returning the ID of the redaction."""
+        return await self._client.send_redaction(self._room, self.event_id, reason)
 
-    async def reply(self, content: str) -> None:
-        """Reply to the event."""
-        await self._client.send_text_message(
+    async def reply(self, content: str) -> str:
+        """Reply to the event, returning the ID of the reply."""
+        return await self._client.send_text_message(
             self._room, content, reply_to=self.event_id
         )
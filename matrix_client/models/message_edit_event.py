@@ -5,19 +5,30 @@ from .event import Event
 from .message_event import MessageEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageEditEvent(Event):
     """Represents a message event."""
 
     content: dict = field(repr=False)
+    _original: str | None = field(init=False, repr=False)
+    _body: str | None = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        relates_to = self.content.get("m.relates_to")
+        original = relates_to.get("event_id") if isinstance(relates_to, dict) else None
+        self._original = original if isinstance(original, str) else None
+        new_content = self.content.get("m.new_content")
+        self._body = None
+        if isinstance(new_content, dict) and new_content.get("msgtype") == "m.text":
+            body = new_content.get("body", "")
+            self._body = body if isinstance(body, str) else None
 
     @property
     def original(self) -> MessageEvent | None:
         """Return the original message."""
-        event_id = self.content.get("m.relates_to", {}).get("event_id")
-        if event_id is None:
+        if self._original is None:
             return None
-        event = self._client.get_event(event_id)
+        event = self._client.get_event(self._original)
         if not isinstance(event, MessageEvent):
             return None
         return event
@@ -25,6 +36,6 @@ class MessageEditEvent(Event):
     @property
     def body(self) -> str:
         """Return the body."""
-        if self.content.get("m.new_content", {}).get("msgtype") == "m.text":
-            return self.content.get("m.new_content", {}).get("body", "")
-        raise ValueError("Event is not a text message.")
+        if self._body is None:
+            raise ValueError("Event is not a text message.")
+        return self._body
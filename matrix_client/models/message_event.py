@@ -24,12 +24,62 @@ class MessageType(enum.Enum):
     UNKNOWN = None
 
 
-@dataclass
+ATTACHMENT_TYPES = (
+    MessageType.IMAGE,
+    MessageType.FILE,
+    MessageType.AUDIO,
+    MessageType.VIDEO,
+)
+
+_MESSAGE_TYPES = {
+    message_type.value: message_type
+    for message_type in MessageType
+    if message_type is not MessageType.UNKNOWN
+}
+
+
+@dataclass(slots=True)
 class MessageEvent(Event):
-    """Represents a message event."""
+    """Represents a message event.
+
+    The message type, body and reply relation are parsed from the content
+    once, when the event is created.
+    """
 
     content: dict = field(repr=False)
     edits: list[MessageEditEvent] = field(default_factory=list)
+    _message_type: MessageType = field(init=False, repr=False)
+    _body: str | None = field(init=False, repr=False)
+    _reply_to: str | None = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Content comes from any room member, so nothing in it can be
+        # trusted to have the right type
+        msgtype = self.content.get("msgtype")
+        self._message_type = (
+            _MESSAGE_TYPES.get(msgtype, MessageType.UNKNOWN)
+            if isinstance(msgtype, str)
+            else MessageType.UNKNOWN
+        )
+        relates_to = self.content.get("m.relates_to")
+        in_reply_to = (
+            relates_to.get("m.in_reply_to") if isinstance(relates_to, dict) else None
+        )
+        reply_to = (
+            in_reply_to.get("event_id") if isinstance(in_reply_to, dict) else None
+        )
+        self._reply_to = reply_to if isinstance(reply_to, str) else None
+
+        self._body = None
+        body = self.content.get("body", "")
+        if not isinstance(body, str):
+            return
+        if self._message_type is MessageType.TEXT:
+            if in_reply_to:
+                body = "\n\n".join(body.split("\n\n")[1:])
+            self._body = body
+        elif self._message_type in (MessageType.NOTICE, MessageType.EMOTE):
+            self._body = body
 
     def __repr__(self) -> str:
         return f"MessageEvent(message_type={self.message_type!r}, body={self.body!r})"
@@ -37,68 +87,38 @@ class MessageEvent(Event):
     @property
     def reply_to(self) -> Event | None:
         """Return the event replied to."""
-        event_id = (
-            self.content.get("m.relates_to", {})
-            .get("m.in_reply_to", {})
-            .get("event_id")
-        )
-        if event_id is None:
+        if self._reply_to is None:
             return None
-        return self._client.get_event(event_id)
+        return self._client.get_event(self._reply_to)
 
     @property
     def message_type(self) -> MessageType:
         """Return the message type."""
-        match self.content.get("msgtype"):
-            case "m.text":
-                return MessageType.TEXT
-            case "m.notice":
-                return MessageType.NOTICE
-            case "m.emote":
-                return MessageType.EMOTE
-            case "m.image":
-                return MessageType.IMAGE
-            case "m.file":
-                return MessageType.FILE
-            case "m.audio":
-                return MessageType.AUDIO
-            case "m.video":
-                return MessageType.VIDEO
-            case "m.location":
-                return MessageType.LOCATION
-            case _:
-                return MessageType.UNKNOWN
+        return self._message_type
 
     @property
     def body(self) -> str | None:
         """Return the body."""
-        if self.content.get("msgtype") == "m.text":
-            body = self.content.get("body", "")
-            if self.content.get("m.relates_to", {}).get("m.in_reply_to"):
-                body = "\n\n".join(body.split("\n\n")[1:])
-            return body
-        if self.content.get("msgtype") in ["m.notice", "m.emote"]:
-            return self.content.get("body", "")
-        return None
+        return self._body
 
     @property
     def attachment(self) -> Attachment | None:
         """Return the attachment."""
-        if self.content.get("msgtype") in ["m.image", "m.file", "m.audio", "m.video"]:
+        if self._message_type in ATTACHMENT_TYPES:
             return Attachment(self._client, self.content)
         return None
 
     @property
     def geo_uri(self) -> str | None:
         """Return the geo URI for location messages."""
-        if self.content.get("msgtype") == "m.location":
+        if self._message_type is MessageType.LOCATION:
             return self.content.get("body")
         return None
 
     @property
     def attachment_filename(self) -> str | None:
         """Return the image filename."""
-        if self.content.get("msgtype") in ["m.image", "m.file", "m.audio", "m.video"]:
+        if self._message_type in ATTACHMENT_TYPES:
             return self.content.get("body")
         return None
 
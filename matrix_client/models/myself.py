@@ -4,7 +4,7 @@ from .base import Base
 from .user import User
 
 
-@dataclass
+@dataclass(slots=True)
 class Myself(Base):
     """Represents the authenticated user."""
 
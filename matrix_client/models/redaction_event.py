@@ -4,19 +4,23 @@ from dataclasses import dataclass, field
 from .event import Event
 
 
-@dataclass
+@dataclass(slots=True)
 class RedactionEvent(Event):
     """Represents a redaction event."""
 
     content: dict = field(repr=False)
+    _redacts: str | None = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        redacts = self.content.get("redacts")
+        self._redacts = redacts if isinstance(redacts, str) else None
 
     @property
     def redacts(self) -> Event | None:
         """Return the event redacted."""
-        event_id = self.content.get("redacts")
-        if event_id is None:
+        if self._redacts is None:
             return None
-        return self._client.get_event(event_id)
+        return self._client.get_event(self._redacts)
 
     @property
     def reason(self) -> str | None:
@@ -1,14 +1,27 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import AsyncIterable, TYPE_CHECKING
+from typing import Any, AsyncIterable, AsyncIterator, Callable, TYPE_CHECKING, TypeVar
 
 from .base import Base
 
 if TYPE_CHECKING:
+    from ..room_state import RoomState
     from .user import User
 
 
-@dataclass
+T = TypeVar("T")
+
+
+def _content_getter(key: str) -> Callable[[dict | None], Any]:
+    def get(event: dict | None) -> Any:
+        if event is None:
+            return None
+        return event.get("content", {}).get(key)
+
+    return get
+
+
+@dataclass(slots=True)
 class RoomMember(Base):
     """Represents a room member."""
 
@@ -21,38 +34,73 @@ class RoomMember(Base):
         return await self._client.get_user(self.user_id)
 
 
-@dataclass
+@dataclass(slots=True)
 class Room(Base):
-    """Represents a room."""
+    """Represents a room.
+
+    Rooms are backed by the client's live state, and values derived from
+    it are memoized until the state event they come from is replaced.
+    """
 
     room_id: str
-    state: dict = field(repr=False)
+    state: RoomState = field(repr=False)
+    _cache: dict[tuple[str, str], tuple[dict | None, Any]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def _derive(
+        self, event_type: str, state_key: str, derive: Callable[[dict | None], T]
+    ) -> T:
+        """Derive a value from a state event, reusing it if the event is the same."""
+        event = self.state.get(event_type, state_key)
+        cached = self._cache.get((event_type, state_key))
+        if cached is not None and cached[0] is event:
+            return cached[1]
+        value = derive(event)
+        self._cache[event_type, state_key] = (event, value)
+        return value
 
     @property
     def name(self) -> str | None:
         """Return the name of the room."""
-        for event in reversed(self.state.get("events", [])):
-            if event.get("type") == "m.room.name":
-                return event.get("content", {}).get("name")
-        return None
+        return self._derive("m.room.name", "", _content_getter("name"))
+
+    @property
+    def topic(self) -> str | None:
+        """Return the topic of the room."""
+        return self._derive("m.room.topic", "", _content_getter("topic"))
+
+    def member(self, user_id: str) -> RoomMember | None:
+        """Return a member of the room."""
+        return self._derive("m.room.member", user_id, self._build_member)
+
+    def _build_member(self, event: dict | None) -> RoomMember | None:
+        if event is None:
+            return None
+        return RoomMember(
+            self._client,
+            user_id=event["state_key"],
+            displayname=event.get("content", {}).get("displayname"),
+            membership=event.get("content", {}).get("membership"),
+        )
 
     @property
     def members(self) -> list[RoomMember]:
         """Return the members of the room."""
-        members: dict[str, RoomMember] = {}
-        for event in self.state.get("events", []):
-            if event.get("type") != "m.room.member":
-                continue
-            if "state_key" not in event:
-                continue
-            member = RoomMember(
-                self._client,
-                user_id=event.get("state_key"),
-                displayname=event.get("content", {}).get("displayname"),
-                membership=event.get("content", {}).get("membership"),
-            )
-            members[member.user_id] = member
-        return list(members.values())
+        members = (self.member(user_id) for user_id in self.state.members)
+        return [member for member in members if member is not None]
+
+    async def member_users(self, concurrency: int = 10) -> AsyncIterator[User]:
+        """Return the profiles of the joined members as they resolve."""
+        joined = [
+            user_id
+            for user_id, event in self.state.members.items()
+            if event.get("content", {}).get("membership") == "join"
+        ]
+        async for user in self._client.get_users(
+            joined, room_id=self.room_id, concurrency=concurrency
+        ):
+            yield user
 
     async def aliases(self) -> list[str]:
         """Return the aliases of the room."""
@@ -77,6 +125,6 @@ class Room(Base):
                 params={"from": messages["end"]},
             )
 
-    async def send_text_message(self, content: str) -> None:
-        """Send a text message to the room."""
-        await self._client.send_text_message(self.room_id, content)
+    async def send_text_message(self, content: str) -> str:
+        """Send a text message to the room, returning its event ID."""
+        return await self._client.send_text_message(self.room_id, content)
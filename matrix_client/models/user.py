@@ -4,7 +4,7 @@ from dataclasses import dataclass, field
 from .base import Base
 
 
-@dataclass
+@dataclass(slots=True)
 class User(Base):
     """A matrix user."""
 
@@ -3,13 +3,7 @@ from typing import Awaitable, Callable, Literal, Type, TypeVar, overload
 
 from matrix_client.models.redaction_event import RedactionEvent
 
-from .event_dispatcher import (
-    Context,
-    EventDispatcher,
-    EventTypeFilter,
-    OneTimeFilter,
-    RoomFilter,
-)
+from .event_dispatcher import Context, EventDispatcher
 from .models import Event, MessageEditEvent, MessageEvent
 
 
@@ -125,23 +119,14 @@ class ObserverFactory:
 
             return decorator
 
-        observer = func
-
-        if once:
-            observer = OneTimeFilter[T](observer)
-
-        if room is not None:
-            observer = RoomFilter[T](room, observer)
-
         # The last thing we do is erasing the type
         # Over here func is certainly a callable, therefore if "on" is None,
         # the generic type T wasn't set -> we act as if it's Event, as per the
-        # overloads
-        assignable: Callable[[Context[Event]], Awaitable[None]] = (
-            observer if on is None else EventTypeFilter[Event, T](on, observer)
-        )  # type: ignore
+        # overloads. The dispatcher takes care of filtering by type and room
+        # and of unsubscribing one-time observers.
+        assignable: Callable[[Context[Event]], Awaitable[None]] = func  # type: ignore
 
-        self.event_dispatcher.register(assignable)
+        self.event_dispatcher.register(assignable, on=on, room=room, once=once)
 
         return func
 
@@ -229,8 +214,9 @@ class ObserverFactory:
 
             return decorator
 
-        # I think it's a mlem and not a blep this time
-        self(lambda ctx: func(ctx.event), room=room, once=once, on=None)  # type: ignore
+        self.event_dispatcher.register(
+            func, on=None, room=room, once=once, pass_context=False
+        )
         return func
 
     @overload
@@ -318,7 +304,13 @@ class ObserverFactory:
 
             return decorator
 
-        self(lambda ctx: func(ctx.event), room=room, once=once, on=MessageEvent)  # type: ignore
+        self.event_dispatcher.register(
+            func,  # type: ignore
+            on=MessageEvent,
+            room=room,
+            once=once,
+            pass_context=False,
+        )
         return func
 
     @overload
@@ -405,7 +397,13 @@ class ObserverFactory:
 
             return decorator
 
-        self(lambda ctx: func(ctx.event), room=room, once=once, on=MessageEditEvent)  # type: ignore
+        self.event_dispatcher.register(
+            func,  # type: ignore
+            on=MessageEditEvent,
+            room=room,
+            once=once,
+            pass_context=False,
+        )
         return func
 
     @overload
@@ -492,5 +490,11 @@ class ObserverFactory:
 
             return decorator
 
-        self(lambda ctx: func(ctx.event), room=room, once=once, on=RedactionEvent)  # type: ignore
+        self.event_dispatcher.register(
+            func,  # type: ignore
+            on=RedactionEvent,
+            room=room,
+            once=once,
+            pass_context=False,
+        )
         return func
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+
+
+@dataclass
+class ProfileCacheOptions:
+    """Bounds of the user profile cache; None disables a bound."""
+
+    ttl: float | None = 3600.0
+    max_size: int | None = 10_000
+
+
+class ProfileCache:
+    """A TTL and LRU bounded cache of user profiles.
+
+    Profiles are dicts with `displayname` and `avatar_url`, as returned
+    by the profile endpoint.
+    """
+
+    def __init__(self, options: ProfileCacheOptions | None = None) -> None:
+        self.options = options or ProfileCacheOptions()
+        self._profiles: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, user_id: str) -> dict | None:
+        """Return a cached profile, if there is a fresh one."""
+        cached = self._profiles.get(user_id)
+        if cached is None or (
+            self.options.ttl is not None
+            and time.monotonic() - cached[0] > self.options.ttl
+        ):
+            self.misses += 1
+            return None
+        self._profiles.move_to_end(user_id)
+        self.hits += 1
+        return cached[1]
+
+    def set(self, user_id: str, profile: dict) -> None:
+        """Cache a profile."""
+        self._profiles[user_id] = (time.monotonic(), profile)
+        self._profiles.move_to_end(user_id)
+        if self.options.max_size is not None:
+            while len(self._profiles) > self.options.max_size:
+                self._profiles.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a cached profile."""
+        self._profiles.pop(user_id, None)
+
+    def update_from_member(self, event: dict) -> None:
+        """Update the cache from an m.room.member state event."""
+        user_id = event.get("state_key")
+        if not user_id:
+            return
+        content = event.get("content", {})
+        if content.get("membership") != "join":
+            self.invalidate(user_id)
+            return
+        self.set(
+            user_id,
+            {
+                "displayname": content.get("displayname"),
+                "avatar_url": content.get("avatar_url"),
+            },
+        )
@@ -0,0 +1,160 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+import enum
+import time
+from typing import Mapping
+
+
+class EndpointClass(enum.Enum):
+    """Groups of endpoints that share a rate limit."""
+
+    SEND = "send"
+    SYNC = "sync"
+    MEDIA = "media"
+    PROFILE = "profile"
+    OTHER = "other"
+
+
+def classify(method: str, endpoint: str) -> EndpointClass:
+    """Return the class of an endpoint."""
+    if endpoint.startswith("_matrix/media/"):
+        return EndpointClass.MEDIA
+    if endpoint.endswith("/sync"):
+        return EndpointClass.SYNC
+    if "/profile/" in endpoint or endpoint.endswith("/joined_members"):
+        return EndpointClass.PROFILE
+    if method in ("PUT", "POST") and ("/send/" in endpoint or "/redact/" in endpoint):
+        return EndpointClass.SEND
+    return EndpointClass.OTHER
+
+
+def _default_rates() -> dict[EndpointClass, tuple[float, int] | None]:
+    return {
+        EndpointClass.SEND: (5.0, 10),
+        EndpointClass.SYNC: None,
+        EndpointClass.MEDIA: (5.0, 10),
+        EndpointClass.PROFILE: (10.0, 20),
+        EndpointClass.OTHER: (10.0, 20),
+    }
+
+
+@dataclass
+class RateLimitOptions:
+    """Client-side rate limits.
+
+    `rates` maps each endpoint class to a (requests per second, burst)
+    token bucket, or None to leave it unlimited. A 429 response pauses
+    the whole class for as long as the server asks, or
+    `default_retry_after` seconds if it doesn't say, and the request is
+    retried at most `max_retries` times.
+    """
+
+    rates: dict[EndpointClass, tuple[float, int] | None] = field(
+        default_factory=_default_rates
+    )
+    max_retries: int = 5
+    default_retry_after: float = 5.0
+
+
+@dataclass
+class ThrottleStats:
+    """Throttling counters of an endpoint class."""
+
+    requests: int = 0
+    delayed: int = 0
+    throttled: int = 0
+    waited: float = 0.0
+
+
+class TokenBucket:
+    """A token bucket; waiters are served in order."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Take a token, returning how long we had to wait for it."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """Rate limits requests per endpoint class and shares 429 backoffs."""
+
+    def __init__(self, options: RateLimitOptions | None = None) -> None:
+        self.options = options or RateLimitOptions()
+        self._buckets = {
+            endpoint_class: TokenBucket(*rate)
+            for endpoint_class, rate in self.options.rates.items()
+            if rate is not None
+        }
+        self._blocked_until: dict[EndpointClass, float] = {}
+        self._stats = {
+            endpoint_class: ThrottleStats() for endpoint_class in EndpointClass
+        }
+
+    async def acquire(self, endpoint_class: EndpointClass) -> None:
+        """Wait until a request of this class may be sent."""
+        stats = self._stats[endpoint_class]
+        stats.requests += 1
+        waited = 0.0
+        # Everyone waits for the same backoff window to end, and if it got
+        # extended meanwhile, for the new end
+        while True:
+            delay = self._blocked_until.get(endpoint_class, 0) - time.monotonic()
+            if delay <= 0:
+                break
+            waited += delay
+            await asyncio.sleep(delay)
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is not None:
+            waited += await bucket.acquire()
+        if waited:
+            stats.delayed += 1
+            stats.waited += waited
+
+    def throttle(
+        self, endpoint_class: EndpointClass, retry_after: float | None
+    ) -> None:
+        """Pause a class of endpoints after the server rate limited us."""
+        if retry_after is None:
+            retry_after = self.options.default_retry_after
+        self._stats[endpoint_class].throttled += 1
+        self._blocked_until[endpoint_class] = max(
+            self._blocked_until.get(endpoint_class, 0), time.monotonic() + retry_after
+        )
+
+    def stats(self) -> dict[EndpointClass, ThrottleStats]:
+        """Return the throttling counters of every endpoint class."""
+        return dict(self._stats)
+
+
+def retry_after(headers: Mapping[str, str] | None, body: dict) -> float | None:
+    """Return how many seconds a 429 response asks us to wait, if it says."""
+    retry_after_ms = body.get("retry_after_ms") if isinstance(body, dict) else None
+    if isinstance(retry_after_ms, (int, float)):
+        return retry_after_ms / 1000
+    header = (headers or {}).get("Retry-After")
+    if header is not None:
+        try:
+            return float(header)
+        except ValueError:
+            return None
+    return None
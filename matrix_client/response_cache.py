@@ -0,0 +1,61 @@
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import fnmatch
+import time
+from typing import Hashable
+
+
+@dataclass
+class ResponseCacheOptions:
+    """Which GET endpoints may be answered from a short-lived cache.
+
+    `cacheable` maps endpoint patterns, as understood by fnmatch (for
+    example "_matrix/client/v3/rooms/*/aliases"), to how many seconds a
+    response stays fresh.
+    """
+
+    cacheable: dict[str, float] = field(default_factory=dict)
+    max_size: int = 1_024
+
+
+class ResponseCache:
+    """A small TTL and LRU bounded cache of homeserver responses.
+
+    Cached responses are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, options: ResponseCacheOptions | None = None) -> None:
+        self.options = options or ResponseCacheOptions()
+        self._responses: OrderedDict[Hashable, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+
+    def ttl(self, endpoint: str) -> float | None:
+        """Return how long responses of an endpoint may be cached."""
+        for pattern, ttl in self.options.cacheable.items():
+            if fnmatch.fnmatchcase(endpoint, pattern):
+                return ttl
+        return None
+
+    def get(self, key: Hashable) -> dict | None:
+        """Return a fresh cached response."""
+        cached = self._responses.get(key)
+        if cached is None:
+            return None
+        if cached[0] < time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        self.hits += 1
+        return cached[1]
+
+    def set(self, key: Hashable, response: dict, ttl: float) -> None:
+        """Cache a response for `ttl` seconds."""
+        self._responses[key] = (time.monotonic() + ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.options.max_size:
+            self._responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every cached response."""
+        self._responses.clear()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+import enum
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+# Methods that can be safely repeated; sends are PUTs keyed by their
+# transaction ID, so the homeserver deduplicates them
+RETRYABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class ServerError(Exception):
+    """The homeserver answered with a 5xx status."""
+
+    def __init__(self, status: int, body: bytes) -> None:
+        super().__init__(f"Homeserver returned {status}")
+        self.status = status
+        self.body = body
+
+
+class CircuitOpenError(Exception):
+    """The homeserver is considered down, so the request wasn't sent."""
+
+
+# Failures worth another try, as they say nothing about the request itself
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ServerError)
+
+
+@dataclass
+class RetryOptions:
+    """Retries of failed requests and the circuit breaker around them.
+
+    Connection errors, timeouts and 5xx responses are retried up to
+    `max_attempts` times with jittered exponential backoff, as long as the
+    request's `deadline` (in seconds) hasn't passed. Non-idempotent
+    requests are only retried if they never reached the server. After
+    `failure_threshold` failures in a row, requests fail straight away
+    for `reset_timeout` seconds, after which a single request probes
+    whether the server is back.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    deadline: float = 60.0
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+class CircuitState(enum.Enum):
+    """The state of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops sending requests to a server that keeps failing."""
+
+    def __init__(self, options: RetryOptions) -> None:
+        self.options = options
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the current state, for health checks."""
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if self.retry_in() > 0:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def retry_in(self) -> float:
+        """Return how long until the open circuit lets a probe through."""
+        if self._opened_at is None:
+            return 0.0
+        reopens = self._opened_at + self.options.reset_timeout
+        return max(0.0, reopens - time.monotonic())
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError unless a request may be sent now."""
+        state = self.state
+        if state is CircuitState.OPEN or (
+            state is CircuitState.HALF_OPEN and self._probing
+        ):
+            raise CircuitOpenError(
+                f"Homeserver unavailable, retrying in {self.retry_in():.1f}s"
+            )
+        if state is CircuitState.HALF_OPEN:
+            self._probing = True
+
+    def success(self) -> None:
+        """Record a request the server handled."""
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def failure(self) -> None:
+        """Record a request that failed because of the server or network."""
+        self.failures += 1
+        self._probing = False
+        if (
+            self._opened_at is not None
+            or self.failures >= self.options.failure_threshold
+        ):
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Let another probe through after one ended without an answer."""
+        self._probing = False
+
+
+class RetryPolicy:
+    """Retries transient failures and keeps the circuit breaker updated."""
+
+    def __init__(self, options: RetryOptions | None = None) -> None:
+        self.options = options or RetryOptions()
+        self.breaker = CircuitBreaker(self.options)
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay before the given retry, with full jitter."""
+        ceiling = min(
+            self.options.max_delay, self.options.base_delay * 2 ** (attempt - 1)
+        )
+        return random.uniform(0, ceiling)
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        *,
+        idempotent: bool,
+        deadline: float | None = None,
+    ) -> T:
+        """Run a request, retrying it on transient failures."""
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + (deadline or self.options.deadline)
+        attempt = 0
+        while True:
+            self.breaker.allow()
+            try:
+                async with asyncio.timeout_at(expires):
+                    result = await call()
+            except TRANSIENT_ERRORS as error:
+                self.breaker.failure()
+                attempt += 1
+                retryable = idempotent or isinstance(
+                    error, aiohttp.ClientConnectorError
+                )
+                delay = self.backoff(attempt)
+                if (
+                    not retryable
+                    or attempt >= self.options.max_attempts
+                    or loop.time() + delay >= expires
+                ):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.success()
+                return result
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import sys
+
+
+class RoomState:
+    """The current state of a room, keyed by event type and state key.
+
+    It's updated incrementally from the state and timeline of each sync,
+    so every lookup is a dict access and every update only touches the
+    keys that changed. With the sync filter built from the observers,
+    only member, name and topic changes are guaranteed to reach it (see
+    `SyncOptions.filter_from_observers`).
+    """
+
+    def __init__(self) -> None:
+        self._events: dict[tuple[str, str], dict] = {}
+        self._members: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def apply(self, event: dict) -> bool:
+        """Apply a state event, returning whether it was one."""
+        state_key = event.get("state_key")
+        if state_key is None or "type" not in event:
+            return False
+        event_type = sys.intern(event["type"])
+        self._events[event_type, state_key] = event
+        if event_type == "m.room.member":
+            self._members[state_key] = event
+        return True
+
+    def get(self, event_type: str, state_key: str = "") -> dict | None:
+        """Return the current state event of a type and state key."""
+        return self._events.get((event_type, state_key))
+
+    def content(self, event_type: str, state_key: str = "") -> dict:
+        """Return the content of the current state event, or an empty dict."""
+        event = self._events.get((event_type, state_key))
+        if event is None:
+            return {}
+        return event.get("content", {})
+
+    @property
+    def members(self) -> dict[str, dict]:
+        """Return the member events, keyed by user ID."""
+        return self._members
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+import traceback
+from typing import Awaitable, Callable
+
+from .event_queue import EventQueues
+from .models import Event
+
+
+@dataclass
+class SchedulerOptions:
+    """Options of the worker pool running the observers.
+
+    `events_per_turn` is how many events of one room a worker handles
+    before letting other rooms go first: 1 interleaves rooms as fairly as
+    possible, larger values favour draining busy rooms.
+    """
+
+    workers: int = 8
+    events_per_turn: int = 1
+
+
+class RoomScheduler:
+    """Runs queued events on a fixed pool of workers.
+
+    A room is handled by at most one worker at a time, so events within a
+    room are still handled in order, while different rooms run in
+    parallel. Rooms with nothing queued hold no task and no queue.
+    """
+
+    def __init__(
+        self,
+        queues: EventQueues,
+        handler: Callable[[Event], Awaitable[None]],
+        options: SchedulerOptions | None = None,
+    ) -> None:
+        self.queues = queues
+        self.handler = handler
+        self.options = options or SchedulerOptions()
+        self._ready: asyncio.Queue[str] = asyncio.Queue()
+        self._scheduled: set[str] = set()
+        self._workers: list[asyncio.Task] = []
+
+    def notify(self, room_id: str) -> None:
+        """Let the workers know a room has events queued."""
+        if not self._workers:
+            self.start()
+        if room_id in self._scheduled:
+            return
+        self._scheduled.add(room_id)
+        self._ready.put_nowait(room_id)
+
+    def start(self) -> None:
+        """Start the workers."""
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.options.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers, abandoning anything still queued."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self) -> None:
+        while True:
+            room_id = await self._ready.get()
+            try:
+                for _ in range(self.options.events_per_turn):
+                    event = self.queues.get_nowait(room_id)
+                    if event is None:
+                        break
+                    await self.handler(event)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if task is not None and task.cancelling():
+                    raise
+                # Only the handler was cancelled, not the worker
+                traceback.print_exc()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                # Whatever happened, the room must not stay scheduled
+                # without a worker on it
+                if self.queues.depth(room_id):
+                    # Back of the line, so that other rooms get their turn
+                    self._ready.put_nowait(room_id)
+                else:
+                    self._scheduled.discard(room_id)
+                    self.queues.reap(room_id)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+import enum
+import itertools
+from typing import Awaitable, Callable
+
+
+class SendPriority(enum.IntEnum):
+    """Lanes of the send queue; lower values are sent first."""
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+@dataclass
+class SendOptions:
+    """Options of the outbound send queue.
+
+    `concurrency` caps how many sends are in flight at once across all
+    rooms.
+    """
+
+    concurrency: int = 4
+
+
+@dataclass(slots=True)
+class _Send:
+    event_type: str
+    content: dict
+    future: asyncio.Future[str]
+
+
+class SendQueue:
+    """Sends events on a fixed pool of workers.
+
+    A room has at most one send in flight, so events sent to a room
+    arrive in the order they were queued within each priority lane.
+    Higher lanes go first, both across rooms and within a room, so a
+    redaction can overtake chatter queued before it.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, str, dict], Awaitable[str]],
+        options: SendOptions | None = None,
+    ) -> None:
+        self.send = send
+        self.options = options or SendOptions()
+        self._lanes: dict[str, tuple[deque[_Send], ...]] = {}
+        self._ready: asyncio.PriorityQueue[tuple[int, int, str]] = (
+            asyncio.PriorityQueue()
+        )
+        # The best priority each room is queued at, to avoid duplicates
+        self._queued: dict[str, int] = {}
+        self._in_flight: set[str] = set()
+        self._order = itertools.count()
+        self._workers: list[asyncio.Task] = []
+
+    def submit(
+        self,
+        room_id: str,
+        event_type: str,
+        content: dict,
+        priority: SendPriority = SendPriority.NORMAL,
+    ) -> asyncio.Future[str]:
+        """Queue an event, returning a future of its event ID."""
+        if not self._workers:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        lanes = self._lanes.get(room_id)
+        if lanes is None:
+            lanes = self._lanes[room_id] = tuple(deque() for _ in SendPriority)
+        lanes[priority].append(_Send(event_type, content, future))
+        if room_id not in self._in_flight:
+            self._schedule(room_id, priority)
+        return future
+
+    def depth(self, room_id: str | None = None) -> int:
+        """Return how many sends are waiting, in a room or overall."""
+        if room_id is not None:
+            return sum(map(len, self._lanes.get(room_id, ())))
+        return sum(sum(map(len, lanes)) for lanes in self._lanes.values())
+
+    def start(self) -> None:
+        """Start the workers."""
+        self._workers = [
+            asyncio.create_task(self._work())
+            for _ in range(self.options.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers, cancelling anything still queued."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for lanes in self._lanes.values():
+            for lane in lanes:
+                for send in lane:
+                    send.future.cancel()
+        self._lanes.clear()
+        self._queued.clear()
+        self._in_flight.clear()
+
+    def _schedule(self, room_id: str, priority: int) -> None:
+        if self._queued.get(room_id, len(SendPriority)) <= priority:
+            return
+        self._queued[room_id] = priority
+        self._ready.put_nowait((priority, next(self._order), room_id))
+
+    def _next(self, room_id: str) -> _Send | None:
+        for lane in self._lanes.get(room_id, ()):
+            if lane:
+                return lane.popleft()
+        return None
+
+    async def _work(self) -> None:
+        while True:
+            _, _, room_id = await self._ready.get()
+            # Rooms can be queued again at a better priority, so an entry
+            # may be stale by the time it comes up
+            if room_id in self._in_flight or room_id not in self._queued:
+                continue
+            del self._queued[room_id]
+            send = self._next(room_id)
+            if send is None:
+                continue
+            self._in_flight.add(room_id)
+            try:
+                if not send.future.cancelled():
+                    await self._send(room_id, send)
+            finally:
+                if not send.future.done():
+                    send.future.cancel()
+                self._in_flight.discard(room_id)
+                self._reschedule(room_id)
+
+    async def _send(self, room_id: str, send: _Send) -> None:
+        # The send runs in a task of its own and its error is never raised
+        # here, so the error's traceback doesn't include this suspended
+        # worker: frame.clear() on that traceback would close the worker
+        task = asyncio.ensure_future(
+            self.send(room_id, send.event_type, send.content)
+        )
+        try:
+            await asyncio.wait([task])
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if task.cancelled():
+            send.future.cancel()
+        elif (error := task.exception()) is not None:
+            if not send.future.cancelled():
+                send.future.set_exception(error)
+        elif not send.future.cancelled():
+            send.future.set_result(task.result())
+
+    def _reschedule(self, room_id: str) -> None:
+        lanes = self._lanes.get(room_id, ())
+        for priority, lane in enumerate(lanes):
+            if lane:
+                self._schedule(room_id, priority)
+                return
+        self._lanes.pop(room_id, None)
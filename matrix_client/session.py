@@ -0,0 +1,46 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+
+import aiohttp
+
+
+@dataclass
+class ConnectionOptions:
+    """Options for the pooled HTTP connector."""
+
+    limit: int = 100
+    limit_per_host: int = 10
+    keepalive_timeout: float = 30.0
+    ttl_dns_cache: int | None = 300
+
+
+class SessionPool:
+    """Owns a single long-lived aiohttp session shared by the client."""
+
+    def __init__(self, options: ConnectionOptions | None = None) -> None:
+        self.options = options or ConnectionOptions()
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it if needed."""
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.options.limit,
+                    limit_per_host=self.options.limit_per_host,
+                    keepalive_timeout=self.options.keepalive_timeout,
+                    ttl_dns_cache=self.options.ttl_dns_cache,
+                    use_dns_cache=self.options.ttl_dns_cache is not None,
+                )
+                self._session = aiohttp.ClientSession(connector=connector)
+            return self._session
+
+    async def close(self) -> None:
+        """Close the session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
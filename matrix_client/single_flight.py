@@ -0,0 +1,50 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(slots=True)
+class _Call(Generic[V]):
+    future: asyncio.Future[V]
+    waiters: int = 0
+
+
+class SingleFlight(Generic[K, V]):
+    """Shares one in-flight call between concurrent callers with the same key."""
+
+    def __init__(self) -> None:
+        self._calls: dict[K, _Call[V]] = {}
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        """Run `call`, or wait for the one already running for `key`.
+
+        The call is only cancelled once every caller waiting for it has
+        been cancelled.
+        """
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = _Call(asyncio.ensure_future(call()))
+            self._calls[key] = flight
+            flight.future.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.shared += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.future.done():
+                flight.future.cancel()
+
+    def _forget(self, key: K, flight: _Call[V]) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
@@ -0,0 +1,228 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+import sqlite3
+import traceback
+
+from .json_codec import JSONCodec, get_codec
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    next_batch TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    room_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    state_key TEXT NOT NULL,
+    event BLOB NOT NULL,
+    PRIMARY KEY (room_id, type, state_key)
+);
+CREATE TABLE IF NOT EXISTS timeline (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_id TEXT NOT NULL,
+    event_id TEXT NOT NULL UNIQUE,
+    event BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS timeline_room ON timeline (room_id, position);
+"""
+
+
+@dataclass
+class StoreOptions:
+    """Where and how the sync snapshot is persisted.
+
+    The latest `timeline_limit` events of each room are kept. Changes are
+    buffered in memory and written every `flush_interval` seconds, or
+    sooner once `max_pending` events are waiting.
+    """
+
+    path: str
+    timeline_limit: int = 50
+    flush_interval: float = 1.0
+    max_pending: int = 1000
+
+
+@dataclass
+class Snapshot:
+    """What the store holds: the sync token, room state and timelines."""
+
+    next_batch: str = ""
+    state: dict[str, list[dict]] = field(default_factory=dict)
+    timeline: dict[str, list[dict]] = field(default_factory=dict)
+
+
+@dataclass
+class _Batch:
+    next_batch: str | None = None
+    state: dict[tuple[str, str, str], dict] = field(default_factory=dict)
+    timeline: list[tuple[str, dict]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.state) + len(self.timeline)
+
+    def merge(self, newer: _Batch, timeline_limit: int) -> _Batch:
+        """Combine with a later batch, keeping what the store would keep."""
+        timeline: list[tuple[str, dict]] = []
+        kept: dict[str, int] = {}
+        for room_id, event in reversed(self.timeline + newer.timeline):
+            if kept.get(room_id, 0) < timeline_limit:
+                kept[room_id] = kept.get(room_id, 0) + 1
+                timeline.append((room_id, event))
+        timeline.reverse()
+        return _Batch(
+            newer.next_batch if newer.next_batch is not None else self.next_batch,
+            self.state | newer.state,
+            timeline,
+        )
+
+
+class SyncStore:
+    """Persists the sync token, room state and recent timelines in SQLite.
+
+    Recording changes only touches an in-memory batch; batches are
+    written by a background task in a worker thread, each in a single
+    transaction together with the sync token they lead up to, so the
+    stored token never gets ahead of the stored state.
+    """
+
+    def __init__(
+        self, options: StoreOptions, json_codec: JSONCodec | None = None
+    ) -> None:
+        self.options = options
+        self.json_codec = json_codec or get_codec()
+        self._connection: sqlite3.Connection | None = None
+        self._batch = _Batch()
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._closing = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                self.options.path, check_same_thread=False
+            )
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    async def load(self) -> Snapshot:
+        """Read the stored snapshot."""
+        async with self._lock:
+            return await asyncio.to_thread(self._load)
+
+    def _load(self) -> Snapshot:
+        connection = self._connect()
+        snapshot = Snapshot()
+        row = connection.execute("SELECT next_batch FROM sync").fetchone()
+        if row is not None:
+            snapshot.next_batch = row[0]
+        loads = self.json_codec.loads
+        for room_id, event in connection.execute("SELECT room_id, event FROM state"):
+            snapshot.state.setdefault(room_id, []).append(loads(event))
+        for room_id, event in connection.execute(
+            "SELECT room_id, event FROM timeline ORDER BY position"
+        ):
+            snapshot.timeline.setdefault(room_id, []).append(loads(event))
+        return snapshot
+
+    def record_state(self, room_id: str, event: dict) -> None:
+        """Queue a state event to be stored."""
+        self._batch.state[room_id, event["type"], event["state_key"]] = event
+        self._pending()
+
+    def record_timeline(self, room_id: str, events: list[dict]) -> None:
+        """Queue timeline events to be stored."""
+        self._batch.timeline.extend((room_id, event) for event in events)
+        self._pending()
+
+    def record_sync(self, next_batch: str) -> None:
+        """Queue the token of a fully processed sync to be stored."""
+        self._batch.next_batch = next_batch
+        self._pending()
+
+    def _pending(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        if len(self._batch) >= self.options.max_pending:
+            self._full.set()
+
+    async def _flush_periodically(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(
+                    self._full.wait(), self.options.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # The batch is kept for the next flush; give whatever is
+                # wrong (a full disk, a locked database) some time
+                traceback.print_exc()
+                await asyncio.sleep(self.options.flush_interval)
+
+    async def flush(self) -> None:
+        """Write everything recorded so far.
+
+        If writing fails, the batch is kept and written with the next one.
+        """
+        async with self._lock:
+            self._full.clear()
+            batch, self._batch = self._batch, _Batch()
+            if batch.next_batch is None and not batch:
+                return
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception:
+                self._batch = batch.merge(self._batch, self.options.timeline_limit)
+                raise
+
+    def _write(self, batch: _Batch) -> None:
+        connection = self._connect()
+        dumps = self.json_codec.dumps
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO state VALUES (?, ?, ?, ?)",
+                [(*key, dumps(event)) for key, event in batch.state.items()],
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO timeline (room_id, event_id, event)"
+                " VALUES (?, ?, ?)",
+                [
+                    (room_id, event["event_id"], dumps(event))
+                    for room_id, event in batch.timeline
+                    if "event_id" in event
+                ],
+            )
+            connection.executemany(
+                "DELETE FROM timeline WHERE room_id = ? AND position NOT IN"
+                " (SELECT position FROM timeline WHERE room_id = ?"
+                " ORDER BY position DESC LIMIT ?)",
+                [
+                    (room_id, room_id, self.options.timeline_limit)
+                    for room_id in {room_id for room_id, _ in batch.timeline}
+                ],
+            )
+            if batch.next_batch is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO sync VALUES (0, ?)", (batch.next_batch,)
+                )
+
+    async def close(self) -> None:
+        """Write what's left and close the database."""
+        # Writes run in a thread and can't be interrupted, so the flusher
+        # is asked to finish rather than cancelled
+        self._closing = True
+        self._full.set()
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        self._closing = False
+        try:
+            await self.flush()
+        finally:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,75 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+import time
+
+
+@dataclass
+class SyncOptions:
+    """Options controlling how the client long-polls /sync.
+
+    Timeouts are in milliseconds, as in the Matrix API; the idle backoff
+    is in seconds. With `adaptive` set, the poll timeout and the pause
+    between syncs follow the traffic: busy syncs shorten the poll and drop
+    the pause, empty ones lengthen it up to the configured maximums.
+
+    With `filter_from_observers` set, the client uploads a sync filter
+    built from the registered observers, so the homeserver only sends
+    timeline events of the types and rooms something is listening to.
+    Every joined room still gets its state, but room state then only
+    keeps up with members, names and topics between full syncs; turn it
+    off to track every state type.
+
+    With `pipelined` set, the next sync is requested while the previous
+    one is still being processed; at most `pipeline_depth` fetched
+    responses wait for processing at a time.
+
+    While processing a sync, the client yields to the event loop after
+    every `yield_every` timeline events, so that observers keep running
+    during large catch-up syncs.
+    """
+
+    timeout: int = 30_000
+    adaptive: bool = False
+    min_timeout: int = 5_000
+    max_timeout: int = 60_000
+    max_idle_backoff: float = 5.0
+    max_requests_per_second: float | None = None
+    filter_from_observers: bool = True
+    timeline_limit: int | None = None
+    pipelined: bool = True
+    pipeline_depth: int = 2
+    yield_every: int = 100
+
+
+class SyncCadence:
+    """Decides how long to poll and how long to wait between syncs."""
+
+    def __init__(self, options: SyncOptions | None = None) -> None:
+        self.options = options or SyncOptions()
+        self.timeout = self.options.timeout
+        self.idle_backoff = 0.0
+        self._last_request = 0.0
+
+    async def wait(self) -> None:
+        """Sleep until the next sync request is allowed."""
+        delay = self.idle_backoff
+        if self.options.max_requests_per_second:
+            interval = 1 / self.options.max_requests_per_second
+            delay = max(delay, self._last_request + interval - time.monotonic())
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_request = time.monotonic()
+
+    def record(self, event_count: int) -> None:
+        """Adjust the cadence after a sync returned `event_count` events."""
+        if not self.options.adaptive:
+            return
+        if event_count:
+            self.timeout = max(self.options.min_timeout, self.timeout // 2)
+            self.idle_backoff = 0.0
+        else:
+            self.timeout = min(self.options.max_timeout, self.timeout * 2)
+            self.idle_backoff = min(
+                self.options.max_idle_backoff, max(self.idle_backoff * 2, 0.1)
+            )
@@ -0,0 +1,83 @@
+from __future__ import annotations
+from typing import Type
+
+from .event_dispatcher import Subscription
+from .models import Event, MessageEditEvent, MessageEvent, RedactionEvent
+
+
+# State changes within the timeline window only show up in the timeline,
+# so these have to stay in it for the room state to remain accurate. Other
+# state types are only updated from the state section of the sync.
+STATE_TYPES = ["m.room.member", "m.room.name", "m.room.topic"]
+
+# Messages need their redactions, or Event.redacted is never set
+EVENT_TYPES: dict[Type[Event], list[str]] = {
+    MessageEvent: ["m.room.message", "m.room.redaction"],
+    MessageEditEvent: ["m.room.message", "m.room.redaction"],
+    RedactionEvent: ["m.room.redaction"],
+}
+
+
+def event_types(model: Type[Event] | None) -> list[str] | None:
+    """Return the Matrix event types a model is built from.
+
+    None means the model can be built from any event type.
+    """
+    if model is None:
+        return None
+    for cls in model.__mro__:
+        if cls in EVENT_TYPES:
+            return EVENT_TYPES[cls]
+    return None
+
+
+def build_filter(
+    subscriptions: list[Subscription], timeline_limit: int | None = None
+) -> dict:
+    """Build a sync filter that covers everything the observers need.
+
+    Presence, account data and ephemeral events are never used by the
+    client, so they are always left out. The timeline is narrowed down to
+    the event types and rooms observed, unless some observer wants every
+    type or every room. A narrowed timeline still carries the member,
+    name and topic state events, but changes to any other state within
+    the timeline window are filtered out along with the rest.
+
+    Rooms are only narrowed in the timeline: every joined room keeps its
+    state section, so room names, members and profiles stay available
+    for rooms nobody observes. Their state changes within the timeline
+    window are only picked up once they reach the state section.
+    """
+    timeline: dict = {}
+    room_filter: dict = {
+        "timeline": timeline,
+        "ephemeral": {"types": []},
+        "account_data": {"types": []},
+    }
+
+    if subscriptions:
+        types: set[str] | None = set()
+        rooms: set[str] | None = set()
+        for subscription in subscriptions:
+            observed_types = event_types(subscription.on)
+            if observed_types is None:
+                types = None
+            elif types is not None:
+                types.update(observed_types)
+            if subscription.room is None:
+                rooms = None
+            elif rooms is not None:
+                rooms.add(subscription.room)
+        if types is not None:
+            timeline["types"] = sorted(types.union(STATE_TYPES))
+        if rooms is not None:
+            timeline["rooms"] = sorted(rooms)
+
+    if timeline_limit is not None:
+        timeline["limit"] = timeline_limit
+
+    return {
+        "presence": {"types": []},
+        "account_data": {"types": []},
+        "room": room_filter,
+    }
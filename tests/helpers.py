@@ -0,0 +1,58 @@
+from __future__ import annotations
+import json
+from typing import Awaitable, Callable
+
+# Answers a request with its status, headers and JSON body
+Handler = Callable[[str, str, dict], Awaitable[tuple[int, dict, object]]]
+
+
+class FakeResponse:
+    def __init__(self, status: int, headers: dict, body: object) -> None:
+        self.status = status
+        self.headers = headers
+        self._body = body
+
+    async def read(self) -> bytes:
+        if isinstance(self._body, bytes):
+            return self._body
+        return json.dumps(self._body).encode()
+
+
+class FakeRequest:
+    def __init__(self, handler: Handler, method: str, url: str, kwargs: dict):
+        self._call = handler(method, url, kwargs)
+
+    async def __aenter__(self) -> FakeResponse:
+        return FakeResponse(*await self._call)
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+class FakeSession:
+    """Stands in for the aiohttp session, answering from a handler."""
+
+    def __init__(self, handler: Handler) -> None:
+        self.handler = handler
+        self.closed = False
+        self.requests: list[tuple[str, str]] = []
+
+    def request(self, method: str, url: str, **kwargs) -> FakeRequest:
+        self.requests.append((method, url))
+        return FakeRequest(self.handler, method, url, kwargs)
+
+    def get(self, url: str, **kwargs) -> FakeRequest:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> FakeRequest:
+        return self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def use_session(client, handler: Handler) -> FakeSession:
+    """Make a client (or anything with a session pool) use a handler."""
+    session = FakeSession(handler)
+    client.session_pool._session = session
+    return session
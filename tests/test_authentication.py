@@ -0,0 +1,92 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from matrix_client import Credentials
+from matrix_client.authentication import Authentication
+
+from .helpers import use_session
+
+
+class AuthenticationTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "credentials.json")
+        self.requests: list[str] = []
+        self.valid_tokens = {"saved"}
+
+    async def handler(self, method: str, url: str, kwargs: dict):
+        endpoint = url.rsplit("/v3/", 1)[1]
+        self.requests.append(endpoint)
+        if endpoint == "login":
+            body = json.loads(kwargs["data"])
+            return 200, {}, {
+                "access_token": "new",
+                "user_id": f"@{body['identifier']['user']}:example.org",
+                "device_id": body.get("device_id", "NEW"),
+            }
+        if endpoint == "refresh":
+            return 401, {}, {"errcode": "M_UNKNOWN_TOKEN"}
+        token = kwargs["headers"]["Authorization"].removeprefix("Bearer ")
+        if token not in self.valid_tokens:
+            return 401, {}, {"errcode": "M_UNKNOWN_TOKEN"}
+        return 200, {}, {"user_id": "@alice:example.org", "device_id": "SAVED"}
+
+    def authentication(self, **credentials) -> Authentication:
+        authentication = Authentication(
+            "https://example.org",
+            credentials=Credentials(**credentials),
+            credentials_path=self.path,
+        )
+        use_session(authentication, self.handler)
+        return authentication
+
+    async def test_valid_token_is_reused(self) -> None:
+        authentication = self.authentication(access_token="saved")
+        await authentication.login("alice", "password")
+        self.assertEqual(self.requests, ["account/whoami"])
+        self.assertEqual(authentication.credentials.device_id, "SAVED")
+
+    async def test_token_of_another_account_is_not_reused(self) -> None:
+        authentication = self.authentication(access_token="saved", device_id="SAVED")
+        await authentication.login("bob", "password")
+        self.assertEqual(self.requests, ["account/whoami", "login"])
+        self.assertEqual(authentication.credentials.user_id, "@bob:example.org")
+        self.assertEqual(authentication.credentials.device_id, "NEW")
+
+    async def test_failed_refresh_falls_back_to_password(self) -> None:
+        authentication = self.authentication(
+            access_token="expired",
+            device_id="SAVED",
+            refresh_token="refresh",
+            expires_at=time.time(),
+        )
+        self.assertEqual(await authentication.get_token(), "expired")
+        self.assertEqual(await authentication.get_token(), "expired")
+        self.assertEqual(self.requests, ["refresh"])
+
+        await authentication.login("alice", "password")
+        self.assertEqual(self.requests, ["refresh", "account/whoami", "login"])
+        self.assertEqual(authentication.token, "new")
+        self.assertEqual(authentication.credentials.device_id, "SAVED")
+        with open(self.path) as file:
+            self.assertEqual(json.load(file)["access_token"], "new")
+
+    async def test_unreadable_file_is_like_no_file(self) -> None:
+        for saved in (b"{not json", b'{"token": "old-format"}', b"[]"):
+            with open(self.path, "wb") as file:
+                file.write(saved)
+            with contextlib.redirect_stderr(io.StringIO()):
+                authentication = Authentication(
+                    "https://example.org", credentials_path=self.path
+                )
+            self.assertIsNone(authentication.credentials)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import asyncio
+import unittest
+
+from matrix_client import (
+    CircuitState,
+    Client,
+    MessageEvent,
+    MessageType,
+    RateLimitOptions,
+    ResponseCacheOptions,
+    RetryOptions,
+    SyncOptions,
+)
+
+from .helpers import use_session
+
+
+def message(event_id: str, content: object, event_type: str = "m.room.message"):
+    return {
+        "type": event_type,
+        "event_id": event_id,
+        "sender": "@alice:example.org",
+        "unsigned": {"age": 0},
+        "content": content,
+    }
+
+
+def sync(*events: dict, room_id: str = "!room:example.org") -> dict:
+    return {
+        "next_batch": "s1",
+        "rooms": {"join": {room_id: {"timeline": {"events": list(events)}}}},
+    }
+
+
+class ProcessSyncTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.client = Client("https://example.org")
+
+        @self.client.on.message
+        async def on_message(event: MessageEvent) -> None:
+            pass
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def test_malformed_content_does_not_stop_the_sync(self) -> None:
+        await self.client.process_sync(
+            sync(
+                message("$type", {"msgtype": ["x"], "body": "hi"}),
+                message(
+                    "$reply",
+                    {
+                        "msgtype": "m.text",
+                        "body": 5,
+                        "m.relates_to": {"m.in_reply_to": {"event_id": "$a"}},
+                    },
+                ),
+                message("$relation", {"msgtype": "m.text", "m.relates_to": "x"}),
+                message(
+                    "$edit",
+                    {
+                        "msgtype": "m.text",
+                        "m.new_content": "x",
+                        "m.relates_to": {"rel_type": "m.replace", "event_id": ["$a"]},
+                    },
+                ),
+                message("$redaction", {"redacts": {"x": 1}}, "m.room.redaction"),
+                message("$content", "not a dict"),
+                message("$fine", {"msgtype": "m.text", "body": "hello"}),
+            ),
+            is_initial=False,
+        )
+
+        get = self.client.get_event
+        self.assertEqual(get("$type").message_type, MessageType.UNKNOWN)
+        self.assertIsNone(get("$reply").body)
+        self.assertIsNone(get("$relation").reply_to)
+        self.assertEqual(get("$fine").body, "hello")
+        edit = get("$edit")
+        self.assertIsNone(edit.original)
+        self.assertIsNone(edit._body)
+        self.assertIsNone(get("$redaction").redacts)
+        self.assertNotIsInstance(get("$content"), MessageEvent)
+
+    async def test_large_timeline_yields_to_the_event_loop(self) -> None:
+        self.client.sync_options = SyncOptions(yield_every=100)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        ticks = 0
+        await self.client.process_sync(
+            sync(*(message(f"${i}", {"msgtype": "m.text"}) for i in range(250))),
+            is_initial=False,
+        )
+        ticker.cancel()
+        self.assertGreaterEqual(ticks, 2)
+
+
+class EventLinkTest(unittest.IsolatedAsyncioTestCase):
+    """Nothing observes these events, so they are only stored as records."""
+
+    async def asyncSetUp(self) -> None:
+        self.client = Client("https://example.org")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def test_edit_and_redaction_link_once_the_target_is_built(self) -> None:
+        await self.client.process_sync(
+            sync(message("$a", {"msgtype": "m.text", "body": "hi"})),
+            is_initial=False,
+        )
+        await self.client.process_sync(
+            sync(
+                message(
+                    "$edit",
+                    {
+                        "msgtype": "m.text",
+                        "m.new_content": {"msgtype": "m.text", "body": "hello"},
+                        "m.relates_to": {"rel_type": "m.replace", "event_id": "$a"},
+                    },
+                ),
+                message("$redaction", {"redacts": "$a"}, "m.room.redaction"),
+            ),
+            is_initial=False,
+        )
+        self.assertEqual(self.client.events.stats().lazy, 3)
+
+        target = self.client.get_event("$a")
+        self.assertEqual(target.edits, [self.client.get_event("$edit")])
+        self.assertEqual(target.future_body, "hello")
+        self.assertIs(target.redacted, self.client.get_event("$redaction"))
+
+
+class RequestTest(unittest.IsolatedAsyncioTestCase):
+    async def test_rate_limiting_is_not_a_server_failure(self) -> None:
+        client = Client(
+            "https://example.org",
+            retry_options=RetryOptions(deadline=0.3, failure_threshold=2),
+            rate_limit_options=RateLimitOptions(max_retries=10),
+        )
+        client.authentication.token = "token"
+        limited = 5
+
+        async def handler(method: str, url: str, kwargs: dict):
+            nonlocal limited
+            if limited:
+                limited -= 1
+                return 429, {}, {"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 100}
+            return 200, {}, {"event_id": "$sent"}
+
+        use_session(client, handler)
+        sent = await asyncio.gather(
+            *(client.send_text_message("!room:example.org", "hi") for _ in range(3))
+        )
+        self.assertEqual(sent, ["$sent"] * 3)
+        self.assertIs(client.circuit_state, CircuitState.CLOSED)
+        await client.close()
+
+    async def test_error_responses_are_not_cached(self) -> None:
+        client = Client(
+            "https://example.org",
+            response_cache_options=ResponseCacheOptions(cacheable={"*/rules": 60}),
+        )
+        client.authentication.token = "token"
+        responses = [
+            (403, {}, {"errcode": "M_FORBIDDEN"}),
+            (200, {}, {"rules": []}),
+        ]
+
+        async def handler(method: str, url: str, kwargs: dict):
+            return responses.pop(0)
+
+        session = use_session(client, handler)
+        endpoint = "_matrix/client/v3/rules"
+        self.assertIn("errcode", await client._request("GET", endpoint))
+        self.assertEqual(await client._request("GET", endpoint), {"rules": []})
+        self.assertEqual(await client._request("GET", endpoint), {"rules": []})
+        self.assertEqual(len(session.requests), 2)
+        await client.close()
+
+
+class ProfileTest(unittest.IsolatedAsyncioTestCase):
+    async def test_errors_are_not_cached(self) -> None:
+        client = Client("https://example.org")
+        client.authentication.token = "token"
+        responses = [
+            (403, {}, {"errcode": "M_FORBIDDEN", "error": "Not allowed"}),
+            (200, {}, {"displayname": "Alice"}),
+        ]
+
+        async def handler(method: str, url: str, kwargs: dict):
+            return responses.pop(0)
+
+        session = use_session(client, handler)
+        self.assertIsNone(await client.get_user("@alice:example.org"))
+        user = await client.get_user("@alice:example.org")
+        self.assertEqual(user.displayname, "Alice")
+        self.assertEqual(len(session.requests), 2)
+        await client.get_user("@alice:example.org")
+        self.assertEqual(len(session.requests), 2)
+        await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from matrix_client import Event, OverflowPolicy, QueueOptions
+from matrix_client.event_queue import EventQueues
+
+
+def event(event_id: str, room_id: str = "!a") -> Event:
+    return Event(None, "m.room.message", None, "@a:b", room_id, 0, event_id, None)
+
+
+class EventQueuesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_drop_oldest_keeps_the_newest(self) -> None:
+        queues = EventQueues(
+            QueueOptions(max_room_size=2, room_overflow=OverflowPolicy.DROP_OLDEST)
+        )
+        for event_id in ("$1", "$2", "$3"):
+            await queues.put(event(event_id))
+        self.assertEqual(queues.get_nowait("!a").event_id, "$2")
+        self.assertEqual(queues.get_nowait("!a").event_id, "$3")
+        self.assertEqual(queues.stats().dropped, 1)
+
+    async def test_drop_oldest_with_nothing_to_drop(self) -> None:
+        queues = EventQueues(
+            QueueOptions(max_total_size=0, total_overflow=OverflowPolicy.DROP_OLDEST)
+        )
+        await queues.put(event("$1"))
+        self.assertEqual(len(queues), 0)
+        self.assertEqual(queues.stats().dropped, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
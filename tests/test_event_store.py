@@ -0,0 +1,96 @@
+import time
+import unittest
+
+from matrix_client import Client, MessageEvent
+from matrix_client.event_store import EventRecord, EventStore, RetentionPolicy
+from matrix_client.models import Event
+
+from .test_client import message, sync
+
+
+def record(event_id: str, room_id: str = "!a") -> EventRecord:
+    return EventRecord(
+        event_id, "m.room.notice", room_id, "@alice", 0, None, None, Event
+    )
+
+
+def build(record: EventRecord) -> Event:
+    return Event(
+        None,
+        record.type,
+        record.raw,
+        record._sender,
+        record._room,
+        record._age,
+        record.event_id,
+        None,
+    )
+
+
+class EventStoreTest(unittest.TestCase):
+    def store(self, **policy) -> EventStore:
+        return EventStore(RetentionPolicy(**policy), build)
+
+    def test_max_events_evicts_the_oldest(self) -> None:
+        store = self.store(max_events=3)
+        for index in range(5):
+            store.add(record(f"${index}", f"!{index % 2}"))
+        self.assertEqual(list(store._events), ["$2", "$3", "$4"])
+        self.assertEqual(store.stats().evicted, 2)
+
+    def test_rooms_keep_their_own_ring(self) -> None:
+        store = self.store(max_events_per_room=2)
+        for index in range(4):
+            store.add(record(f"$a{index}", "!a"))
+        store.add(record("$b0", "!b"))
+        self.assertEqual([e.event_id for e in store.room("!a")], ["$a2", "$a3"])
+        self.assertEqual([e.event_id for e in store.room("!b")], ["$b0"])
+
+    def test_ttl_expires_old_events(self) -> None:
+        store = self.store(ttl=0.05)
+        store.add(record("$old"))
+        time.sleep(0.06)
+        store.add(record("$new"))
+        self.assertIsNone(store.get("$old"))
+        self.assertIsNotNone(store.get("$new"))
+        self.assertEqual(store.stats().expired, 1)
+
+    def test_lru_evicts_the_least_recently_used(self) -> None:
+        store = self.store(max_events=2, lru=True)
+        store.add(record("$0"))
+        store.add(record("$1"))
+        store.get("$0")
+        store.add(record("$2"))
+        self.assertIn("$0", store)
+        self.assertNotIn("$1", store)
+
+    def test_processed_ids_are_a_sliding_window(self) -> None:
+        store = self.store(max_processed_ids=2)
+        for index in range(3):
+            store.processed_ids.add(f"${index}")
+        self.assertNotIn("$0", store.processed_ids)
+        self.assertIn("$2", store.processed_ids)
+
+
+class DeduplicationTest(unittest.IsolatedAsyncioTestCase):
+    async def test_stored_events_are_not_dispatched_twice(self) -> None:
+        client = Client(
+            "https://example.org",
+            retention_policy=RetentionPolicy(max_processed_ids=3),
+        )
+
+        @client.on.message
+        async def on_message(event: MessageEvent) -> None:
+            pass
+
+        events = [message(f"${index}", {"msgtype": "m.text"}) for index in range(5)]
+        dispatched = await client.handle_timeline("!a", events)
+        self.assertEqual(len(dispatched), 5)
+        # "$0" left the processed IDs window but is still stored
+        self.assertNotIn("$0", client.processed_event_ids)
+        self.assertEqual(await client.handle_timeline("!a", events[:1]), [])
+        await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import time
+import unittest
+
+from matrix_client.rate_limit import (
+    EndpointClass,
+    RateLimiter,
+    RateLimitOptions,
+    TokenBucket,
+    retry_after,
+)
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_bursts_then_paces(self) -> None:
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(4)]
+        elapsed = time.monotonic() - start
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertGreater(waits[2], 0)
+        # Two tokens at 20 per second after the burst
+        self.assertGreaterEqual(elapsed, 0.09)
+
+
+class RateLimiterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.limiter = RateLimiter(RateLimitOptions(rates={EndpointClass.SEND: None}))
+
+    async def test_concurrent_senders_share_the_backoff(self) -> None:
+        self.limiter.throttle(EndpointClass.SEND, 0.05)
+        start = time.monotonic()
+        waiters = asyncio.gather(
+            *(self.limiter.acquire(EndpointClass.SEND) for _ in range(3))
+        )
+        await asyncio.sleep(0.02)
+        # Another 429 meanwhile extends the window for everyone
+        self.limiter.throttle(EndpointClass.SEND, 0.08)
+        await waiters
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        stats = self.limiter.stats()[EndpointClass.SEND]
+        self.assertEqual((stats.requests, stats.delayed, stats.throttled), (3, 3, 2))
+
+    async def test_other_classes_are_not_blocked(self) -> None:
+        self.limiter.throttle(EndpointClass.SEND, 10)
+        await asyncio.wait_for(self.limiter.acquire(EndpointClass.SYNC), 0.1)
+
+    def test_default_retry_after(self) -> None:
+        self.limiter.options.default_retry_after = 10
+        self.limiter.throttle(EndpointClass.SEND, None)
+        blocked = self.limiter._blocked_until[EndpointClass.SEND]
+        self.assertAlmostEqual(blocked - time.monotonic(), 10, delta=1)
+
+
+class RetryAfterTest(unittest.TestCase):
+    def test_prefers_retry_after_ms(self) -> None:
+        body = {"errcode": "M_LIMIT_EXCEEDED", "retry_after_ms": 1500}
+        self.assertEqual(retry_after({"Retry-After": "9"}, body), 1.5)
+
+    def test_numeric_header(self) -> None:
+        self.assertEqual(retry_after({"Retry-After": "2"}, {}), 2.0)
+
+    def test_missing_or_unparsable(self) -> None:
+        self.assertIsNone(retry_after(None, {}))
+        self.assertIsNone(retry_after({}, {"retry_after_ms": "soon"}))
+        date = "Wed, 21 Oct 2015 07:28:00 GMT"
+        self.assertIsNone(retry_after({"Retry-After": date}, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
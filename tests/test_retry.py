@@ -0,0 +1,89 @@
+import time
+import unittest
+
+from matrix_client.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    RetryOptions,
+    RetryPolicy,
+    ServerError,
+)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker(
+            RetryOptions(failure_threshold=2, reset_timeout=0.05)
+        )
+
+    def open(self) -> None:
+        for _ in range(2):
+            self.breaker.allow()
+            self.breaker.failure()
+
+    def test_opens_after_the_failure_threshold(self) -> None:
+        self.breaker.failure()
+        self.assertIs(self.breaker.state, CircuitState.CLOSED)
+        self.breaker.failure()
+        self.assertIs(self.breaker.state, CircuitState.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+
+    def test_half_open_lets_a_single_probe_through(self) -> None:
+        self.open()
+        time.sleep(0.06)
+        self.assertIs(self.breaker.state, CircuitState.HALF_OPEN)
+        self.breaker.allow()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow()
+        self.breaker.release()
+        self.breaker.allow()
+
+    def test_failed_probe_reopens(self) -> None:
+        self.open()
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertIs(self.breaker.state, CircuitState.OPEN)
+
+    def test_successful_probe_closes(self) -> None:
+        self.open()
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.breaker.success()
+        self.assertIs(self.breaker.state, CircuitState.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+
+class RetryPolicyTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.policy = RetryPolicy(RetryOptions(base_delay=0.001, deadline=5))
+        self.attempts = 0
+
+    async def flaky(self) -> str:
+        self.attempts += 1
+        if self.attempts < 3:
+            raise ServerError(502, b"Bad Gateway")
+        return "ok"
+
+    async def test_retries_server_errors(self) -> None:
+        self.assertEqual(await self.policy.run(self.flaky, idempotent=True), "ok")
+        self.assertEqual(self.attempts, 3)
+        self.assertEqual(self.policy.retries, 2)
+        self.assertIs(self.policy.breaker.state, CircuitState.CLOSED)
+
+    async def test_does_not_retry_non_idempotent_requests(self) -> None:
+        with self.assertRaises(ServerError):
+            await self.policy.run(self.flaky, idempotent=False)
+        self.assertEqual(self.attempts, 1)
+
+    async def test_gives_up_after_max_attempts(self) -> None:
+        self.policy.options.max_attempts = 2
+        with self.assertRaises(ServerError):
+            await self.policy.run(self.flaky, idempotent=True)
+        self.assertEqual(self.attempts, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
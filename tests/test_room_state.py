@@ -0,0 +1,91 @@
+import itertools
+import unittest
+
+from matrix_client import Client
+
+
+EVENT_IDS = itertools.count()
+
+
+def state(event_type: str, state_key: str, content: dict) -> dict:
+    return {
+        "type": event_type,
+        "state_key": state_key,
+        "event_id": f"$state{next(EVENT_IDS)}",
+        "sender": "@alice:example.org",
+        "unsigned": {"age": 0},
+        "content": content,
+    }
+
+
+def sync(*events: dict, timeline: tuple[dict, ...] = ()) -> dict:
+    room = {"state": {"events": list(events)}, "timeline": {"events": list(timeline)}}
+    return {"next_batch": "s1", "rooms": {"join": {"!room:example.org": room}}}
+
+
+NAME = state("m.room.name", "", {"name": "Lobby"})
+ALICE = state("m.room.member", "@alice:example.org", {"membership": "join"})
+
+
+class RoomStateTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.client = Client("https://example.org")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def test_state_survives_an_unrelated_delta(self) -> None:
+        await self.client.process_sync(sync(NAME, ALICE), is_initial=True)
+        topic = state("m.room.topic", "", {"topic": "Chat"})
+        bob = state("m.room.member", "@bob:example.org", {"membership": "join"})
+        await self.client.process_sync(sync(topic, timeline=(bob,)), is_initial=False)
+
+        room = self.client.get_room("!room:example.org")
+        self.assertEqual(room.name, "Lobby")
+        self.assertEqual(room.topic, "Chat")
+        self.assertEqual(
+            [member.user_id for member in room.members],
+            ["@alice:example.org", "@bob:example.org"],
+        )
+
+    async def test_empty_sync_keeps_the_state(self) -> None:
+        await self.client.process_sync(sync(NAME, ALICE), is_initial=True)
+        await self.client.process_sync({"next_batch": "s2"}, is_initial=False)
+        room = self.client.get_room("!room:example.org")
+        self.assertEqual(room.name, "Lobby")
+        self.assertIsNotNone(room.member("@alice:example.org"))
+
+
+class RoomMemoizationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.client = Client("https://example.org")
+        await self.client.process_sync(sync(NAME, ALICE), is_initial=True)
+        self.room = self.client.get_room("!room:example.org")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def test_rooms_are_cached(self) -> None:
+        self.assertIs(self.client.get_room("!room:example.org"), self.room)
+
+    async def test_values_change_only_with_their_state_key(self) -> None:
+        alice = self.room.member("@alice:example.org")
+        self.assertIs(self.room.member("@alice:example.org"), alice)
+
+        bob = state("m.room.member", "@bob:example.org", {"membership": "join"})
+        topic = state("m.room.topic", "", {"topic": "Chat"})
+        await self.client.process_sync(sync(bob, topic), is_initial=False)
+        self.assertIs(self.room.member("@alice:example.org"), alice)
+        self.assertEqual(self.room.name, "Lobby")
+
+        renamed = state("m.room.name", "", {"name": "Hall"})
+        left = state("m.room.member", "@alice:example.org", {"membership": "leave"})
+        await self.client.process_sync(sync(renamed, left), is_initial=False)
+        self.assertEqual(self.room.name, "Hall")
+        member = self.room.member("@alice:example.org")
+        self.assertIsNot(member, alice)
+        self.assertEqual(member.membership, "leave")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+import io
+import random
+import unittest
+
+from matrix_client import Event, SchedulerOptions
+from matrix_client.event_queue import EventQueues
+from matrix_client.scheduler import RoomScheduler
+
+from .test_event_queue import event
+
+
+class RoomSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.queues = EventQueues()
+        self.handled: list[str] = []
+        self.busy: set[str] = set()
+        self.overlapped = False
+
+    async def asyncTearDown(self) -> None:
+        await self.scheduler.stop()
+
+    def schedule(self, **options) -> None:
+        self.scheduler = RoomScheduler(
+            self.queues, self.handle, SchedulerOptions(**options)
+        )
+
+    async def handle(self, event: Event) -> None:
+        self.overlapped |= event._room in self.busy
+        self.busy.add(event._room)
+        await asyncio.sleep(random.uniform(0, 0.002))
+        self.busy.discard(event._room)
+        self.handled.append(event.event_id)
+
+    async def queue(self, *event_ids: str) -> None:
+        for event_id in event_ids:
+            room_id = event_id[:2]
+            await self.queues.put(event(event_id, room_id))
+            self.scheduler.notify(room_id)
+
+    async def drain(self) -> None:
+        async with asyncio.timeout(2):
+            while len(self.queues) or self.busy:
+                await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
+
+    async def test_rooms_stay_in_order_across_workers(self) -> None:
+        self.schedule(workers=4)
+        await self.queue(*(f"!{room}{index}" for index in range(10) for room in "abc"))
+        await self.drain()
+        for room in "abc":
+            self.assertEqual(
+                [event_id for event_id in self.handled if event_id[1] == room],
+                [f"!{room}{index}" for index in range(10)],
+            )
+        self.assertFalse(self.overlapped)
+
+    async def test_idle_rooms_are_reaped(self) -> None:
+        self.schedule(workers=2)
+        await self.queue("!a0", "!b0")
+        await self.drain()
+        self.assertEqual(self.queues.stats().rooms, 0)
+        self.assertEqual(self.scheduler._scheduled, set())
+
+    async def test_rooms_take_turns(self) -> None:
+        for events_per_turn, order in (
+            (1, ["!a0", "!b0", "!a1", "!b1", "!a2", "!b2"]),
+            (2, ["!a0", "!a1", "!b0", "!b1", "!a2", "!b2"]),
+        ):
+            with self.subTest(events_per_turn=events_per_turn):
+                self.handled.clear()
+                self.schedule(workers=1, events_per_turn=events_per_turn)
+                await self.queue("!a0", "!a1", "!a2", "!b0", "!b1", "!b2")
+                await self.drain()
+                self.assertEqual(self.handled, order)
+                await self.scheduler.stop()
+
+    async def test_failing_handler_does_not_strand_the_room(self) -> None:
+        self.schedule(workers=1)
+        failures = [asyncio.CancelledError(), ValueError("bad event")]
+        handle = self.handle
+
+        async def fail_first(event: Event) -> None:
+            if failures:
+                raise failures.pop(0)
+            await handle(event)
+
+        self.scheduler.handler = fail_first
+        with contextlib.redirect_stderr(io.StringIO()):
+            await self.queue("!a0", "!a1", "!a2")
+            await self.drain()
+        self.assertEqual(self.handled, ["!a2"])
+        self.assertEqual(self.scheduler._scheduled, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
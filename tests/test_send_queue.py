@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from matrix_client.send_queue import SendOptions, SendPriority, SendQueue
+
+
+class SendQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.sent: list[tuple[str, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def send(self, room_id: str, event_type: str, content: dict) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await self.release.wait()
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        if content.get("fail"):
+            raise ValueError("Could not send event")
+        self.sent.append((room_id, content["body"]))
+        return f"${room_id}{content['body']}"
+
+    async def test_rooms_keep_their_order(self) -> None:
+        queue = SendQueue(self.send, SendOptions(concurrency=3))
+        futures = [
+            queue.submit(room_id, "m.room.message", {"body": str(index)})
+            for index in range(5)
+            for room_id in ("!a", "!b")
+        ]
+        self.assertEqual(
+            await asyncio.gather(*futures),
+            [f"{room_id}{index}" for index in range(5) for room_id in ("$!a", "$!b")],
+        )
+        for room_id in ("!a", "!b"):
+            self.assertEqual(
+                [body for room, body in self.sent if room == room_id],
+                [str(index) for index in range(5)],
+            )
+        # One send per room at a time, whatever the concurrency
+        self.assertEqual(self.max_in_flight, 2)
+        await queue.stop()
+
+    async def test_concurrency_is_capped(self) -> None:
+        queue = SendQueue(self.send, SendOptions(concurrency=2))
+        await asyncio.gather(
+            *(
+                queue.submit(f"!{index}", "m.room.message", {"body": "hi"})
+                for index in range(6)
+            )
+        )
+        self.assertEqual(self.max_in_flight, 2)
+        await queue.stop()
+
+    async def test_redactions_overtake_queued_messages(self) -> None:
+        queue = SendQueue(self.send, SendOptions(concurrency=1))
+        self.release.clear()
+        first = queue.submit("!a", "m.room.message", {"body": "first"})
+        await asyncio.sleep(0)
+        rest = [
+            queue.submit("!a", "m.room.message", {"body": "second"}),
+            queue.submit("!b", "m.room.message", {"body": "other"}),
+            queue.submit(
+                "!a", "m.room.redaction", {"body": "redaction"}, SendPriority.HIGH
+            ),
+        ]
+        self.release.set()
+        await asyncio.gather(first, *rest)
+        # The redaction skips ahead within the room and across rooms;
+        # the room's next message then waits its turn behind the others
+        self.assertEqual(
+            [body for _, body in self.sent],
+            ["first", "redaction", "other", "second"],
+        )
+        await queue.stop()
+
+    async def test_failure_reaches_its_caller_only(self) -> None:
+        queue = SendQueue(self.send)
+        failing = queue.submit("!a", "m.room.message", {"body": "x", "fail": True})
+        after = queue.submit("!a", "m.room.message", {"body": "after"})
+        with self.assertRaises(ValueError):
+            await failing
+        self.assertEqual(await after, "$!aafter")
+        await queue.stop()
+
+    async def test_stop_cancels_queued_sends(self) -> None:
+        queue = SendQueue(self.send, SendOptions(concurrency=1))
+        self.release.clear()
+        futures = [
+            queue.submit("!a", "m.room.message", {"body": str(index)})
+            for index in range(3)
+        ]
+        await asyncio.sleep(0)
+        await queue.stop()
+        self.assertTrue(all(future.cancelled() for future in futures))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+
+from matrix_client.single_flight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.flight: SingleFlight[str, str] = SingleFlight()
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def call(self) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "profile"
+
+    async def test_concurrent_callers_share_one_call(self) -> None:
+        waiters = [
+            asyncio.create_task(self.flight.run("@alice", self.call))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*waiters), ["profile"] * 3)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.shared, 2)
+        self.assertEqual(len(self.flight), 0)
+
+    async def test_cancelling_one_waiter_keeps_the_call(self) -> None:
+        first = asyncio.create_task(self.flight.run("@alice", self.call))
+        second = asyncio.create_task(self.flight.run("@alice", self.call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, "profile")
+        self.assertTrue(first.cancelled())
+        self.assertFalse(self.cancelled)
+
+    async def test_cancelling_every_waiter_cancels_the_call(self) -> None:
+        waiters = [
+            asyncio.create_task(self.flight.run("@alice", self.call))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.assertTrue(self.cancelled)
+        self.assertEqual(len(self.flight), 0)
+        # The next caller starts a call of its own
+        self.release.set()
+        self.assertEqual(await self.flight.run("@alice", self.call), "profile")
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from matrix_client.store import StoreOptions, SyncStore
+
+
+def message(event_id: str) -> dict:
+    return {"type": "m.room.message", "event_id": event_id, "content": {}}
+
+
+class FailingStore(SyncStore):
+    """Fails the first few writes, like a full disk would."""
+
+    failures = 1
+
+    def _write(self, batch) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super()._write(batch)
+
+
+async def load(path: str):
+    store = SyncStore(StoreOptions(path))
+    try:
+        return await store.load()
+    finally:
+        await store.close()
+
+
+class SyncStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "store.db")
+
+    async def test_round_trip(self) -> None:
+        store = SyncStore(StoreOptions(self.path, timeline_limit=2))
+        store.record_state(
+            "!a", {"type": "m.room.name", "state_key": "", "content": {"name": "A"}}
+        )
+        store.record_timeline("!a", [message("$1"), message("$2"), message("$3")])
+        store.record_sync("s1")
+        await store.close()
+
+        snapshot = await load(self.path)
+        self.assertEqual(snapshot.next_batch, "s1")
+        self.assertEqual(snapshot.state["!a"][0]["content"], {"name": "A"})
+        self.assertEqual(
+            [event["event_id"] for event in snapshot.timeline["!a"]], ["$2", "$3"]
+        )
+
+    async def test_failed_write_is_retried(self) -> None:
+        store = FailingStore(StoreOptions(self.path, flush_interval=0.01))
+        store.record_timeline("!a", [message("$1")])
+        store.record_sync("s1")
+        with self.assertRaises(OSError):
+            await store.flush()
+        store.record_timeline("!a", [message("$2")])
+        store.record_sync("s2")
+        await store.flush()
+        await store.close()
+
+        snapshot = await load(self.path)
+        self.assertEqual(snapshot.next_batch, "s2")
+        self.assertEqual(
+            [event["event_id"] for event in snapshot.timeline["!a"]], ["$1", "$2"]
+        )
+
+    async def test_flusher_survives_a_failed_write(self) -> None:
+        store = FailingStore(StoreOptions(self.path, flush_interval=0.01))
+        store.record_timeline("!a", [message("$1")])
+        store.record_sync("s1")
+        # The first flush fails, the next one writes the kept batch
+        await asyncio.sleep(0.1)
+        self.assertFalse(store._flusher.done())
+        self.assertEqual(len(store._batch), 0)
+        await store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
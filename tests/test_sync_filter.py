@@ -0,0 +1,36 @@
+import unittest
+
+from matrix_client import Event, MessageEvent, RedactionEvent
+from matrix_client.event_dispatcher import Subscription
+from matrix_client.sync_filter import STATE_TYPES, build_filter
+
+
+class BuildFilterTest(unittest.TestCase):
+    def test_messages_keep_their_redactions(self) -> None:
+        sync_filter = build_filter([Subscription(MessageEvent, None)])
+        self.assertEqual(
+            sync_filter["room"]["timeline"]["types"],
+            sorted({"m.room.message", "m.room.redaction", *STATE_TYPES}),
+        )
+
+    def test_rooms_are_narrowed(self) -> None:
+        sync_filter = build_filter(
+            [Subscription(RedactionEvent, "!a"), Subscription(MessageEvent, "!b")]
+        )
+        self.assertEqual(sync_filter["room"]["timeline"]["rooms"], ["!a", "!b"])
+
+    def test_other_rooms_keep_their_state(self) -> None:
+        sync_filter = build_filter([Subscription(MessageEvent, "!a")])
+        self.assertNotIn("rooms", sync_filter["room"])
+        self.assertNotIn("state", sync_filter["room"])
+
+    def test_any_event_disables_type_filtering(self) -> None:
+        sync_filter = build_filter(
+            [Subscription(MessageEvent, None), Subscription(Event, None)]
+        )
+        self.assertNotIn("types", sync_filter["room"]["timeline"])
+        self.assertNotIn("rooms", sync_filter["room"]["timeline"])
+
+
+if __name__ == "__main__":
+    unittest.main()